@@ -0,0 +1,207 @@
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from sqlalchemy import func
+from app import models, sharding
+from app.database import SessionLocal
+
+CHUNK_SIZE = 500
+"""
+The default number of posts deleted per transaction.
+- Each chunk is committed on its own, so the SQLite write lock is only held for one chunk at a time.
+- Readers waiting on the lock get a chance to run between chunks.
+"""
+
+CHUNK_PAUSE_SECONDS = 0.01
+"""
+The pause between two chunks, in seconds.
+- Gives other connections an opportunity to take the write lock before the next chunk starts.
+"""
+
+JOB_TTL = timedelta(hours=1)
+"""
+How long a finished job stays in the registry.
+- Clients have this long to read the final status of a job from `GET /posts/bulk/{job_id}`.
+- Jobs still pending or running are never evicted.
+"""
+
+jobs = {}
+"""
+The in-memory registry of bulk jobs, keyed by job ID.
+- Each job is a dictionary holding its kind, status and progress counters.
+- The registry is per process; progress is lost when the worker restarts.
+- Finished jobs are evicted `JOB_TTL` after they finish, when the next job is created.
+"""
+
+_jobs_lock = threading.Lock()
+
+
+def create_job(kind: str):
+    """
+    Register a new bulk job.
+
+    Args:
+        kind (str): A short label for the job (e.g. "delete", "soft_delete", "purge").
+
+    Returns:
+        dict: The job record, with status "pending" and no progress yet.
+
+    Jobs that finished more than `JOB_TTL` ago are evicted at the same time, which
+    keeps the registry bounded by the number of recent jobs.
+    """
+    now = datetime.utcnow()
+    job = {
+        "id": uuid.uuid4().hex,
+        "kind": kind,
+        "status": "pending",
+        "total": 0,
+        "processed": 0,
+        "created_at": now,
+        "finished_at": None,
+        "error": None,
+    }
+    with _jobs_lock:
+        expired = [
+            job_id for job_id, old in jobs.items() if old["finished_at"] is not None and now - old["finished_at"] > JOB_TTL
+        ]
+        for job_id in expired:
+            del jobs[job_id]
+        jobs[job["id"]] = job
+    return job
+
+
+def post_filters(owner_id: int = None, created_after: datetime = None, created_before: datetime = None):
+    """
+    Build the filter conditions selecting posts for a bulk operation.
+
+    Args:
+        owner_id (int): Only select posts owned by this user.
+        created_after (datetime): Only select posts created at or after this time.
+        created_before (datetime): Only select posts created before this time.
+
+    Returns:
+        list: SQLAlchemy filter conditions; empty if no criteria were given.
+    """
+    conditions = []
+    if owner_id is not None:
+        conditions.append(models.Post.owner_id == owner_id)
+    if created_after is not None:
+        conditions.append(models.Post.created_at >= created_after)
+    if created_before is not None:
+        conditions.append(models.Post.created_at < created_before)
+    return conditions
+
+
+def _run_in_chunks(job: dict, conditions: list, apply_chunk, chunk_size: int, finish=None):
+    """
+    Apply an operation to every matching post, one chunk per transaction.
+
+    Args:
+        job (dict): The job record to update with progress.
+        conditions (list): Filter conditions selecting the posts to process.
+        apply_chunk (callable): Called with the session and a list of post IDs; must
+            make those posts stop matching `conditions` (by deleting or updating them).
+        chunk_size (int): The maximum number of posts per transaction.
+        finish (callable): Called with the session once every chunk is done, in a final
+            transaction committed before the job is reported as completed.
+
+    The IDs of the next chunk are selected by primary key, the chunk is applied and
+    committed, and the loop repeats until no rows match. Comments are removed by the
+    database through `ON DELETE CASCADE`, so a chunk is a single statement on `posts`.
+    """
+    db = SessionLocal()
+    try:
+        job["status"] = "running"
+        # One count per shard when sharding is enabled.
+        job["total"] = sum(count for (count,) in db.query(func.count(models.Post.id)).filter(*conditions).all())
+        while True:
+            ids = [
+                row.id
+                for row in db.query(models.Post.id).filter(*conditions).order_by(models.Post.id).limit(chunk_size)
+            ]
+            if not ids:
+                break
+            apply_chunk(db, ids)
+            db.commit()
+            job["processed"] += len(ids)
+            time.sleep(CHUNK_PAUSE_SECONDS)
+        if finish is not None:
+            finish(db)
+            db.commit()
+        job["status"] = "completed"
+    except Exception as exc:
+        db.rollback()
+        job["status"] = "failed"
+        job["error"] = str(exc)
+    finally:
+        job["finished_at"] = datetime.utcnow()
+        db.close()
+
+
+def delete_posts(job: dict, conditions: list, soft: bool = False, chunk_size: int = CHUNK_SIZE):
+    """
+    Delete every post matching the given conditions in bounded chunks.
+
+    Args:
+        job (dict): The job record to update with progress.
+        conditions (list): Filter conditions selecting the posts to delete.
+        soft (bool): If True, tombstone the posts by setting `deleted_at` instead of removing them.
+        chunk_size (int): The maximum number of posts per transaction.
+
+    Soft-deleted posts disappear from every read endpoint immediately and are removed
+    for good later by `purge_deleted_posts`.
+    """
+    conditions = conditions + [models.Post.deleted_at.is_(None)] if soft else conditions
+
+    def apply_chunk(db, ids):
+        query = db.query(models.Post).filter(models.Post.id.in_(ids))
+        if soft:
+            query.update({models.Post.deleted_at: datetime.utcnow()}, synchronize_session=False)
+        else:
+            query.delete(synchronize_session=False)
+
+    _run_in_chunks(job, conditions, apply_chunk, chunk_size)
+
+
+def purge_deleted_posts(job: dict, older_than: timedelta = timedelta(0), chunk_size: int = CHUNK_SIZE):
+    """
+    Permanently remove soft-deleted posts in bounded chunks.
+
+    Args:
+        job (dict): The job record to update with progress.
+        older_than (timedelta): Only purge posts tombstoned at least this long ago.
+        chunk_size (int): The maximum number of posts per transaction.
+    """
+    conditions = [models.Post.deleted_at <= datetime.utcnow() - older_than]
+
+    def apply_chunk(db, ids):
+        db.query(models.Post).filter(models.Post.id.in_(ids)).delete(synchronize_session=False)
+
+    _run_in_chunks(job, conditions, apply_chunk, chunk_size)
+
+
+def delete_user(job: dict, user_id: int, chunk_size: int = CHUNK_SIZE):
+    """
+    Delete a user's posts in bounded chunks, then the user.
+
+    Args:
+        job (dict): The job record to update with progress.
+        user_id (int): The ID of the user to delete.
+        chunk_size (int): The maximum number of posts per transaction.
+
+    The posts (with the comments on them) go first, chunk by chunk, so deleting a
+    user with a long history never holds the write lock for the whole cascade. The
+    user row is deleted in a last transaction; the database cascades it to the
+    comments the user wrote on other posts and to their refresh tokens. If a chunk
+    fails, the user and their remaining posts are kept and the job is marked failed.
+    """
+
+    def apply_chunk(db, ids):
+        db.query(models.Post).filter(models.Post.id.in_(ids)).delete(synchronize_session=False)
+
+    def finish(db):
+        sharding.delete_user_content(db, user_id)
+        db.query(models.User).filter(models.User.id == user_id).delete(synchronize_session=False)
+
+    _run_in_chunks(job, post_filters(owner_id=user_id), apply_chunk, chunk_size, finish)
@@ -0,0 +1,106 @@
+import hashlib
+from datetime import timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from fastapi import Request, Response
+
+CACHE_CONTROL = {
+    "post": "public, max-age=60",
+    "posts": "public, max-age=10",
+    "comments": "public, max-age=30",
+}
+"""
+The `Cache-Control` policy sent with each kind of cacheable response.
+- `post`: A single post (`GET /posts/{post_id}`).
+- `posts`: Post listings (`GET /posts/`).
+- `comments`: The comments of a post (`GET /{post_id}`).
+- Raise `max-age` (or add `s-maxage`) to let a reverse proxy serve more reads without
+  revalidating; set a policy to `no-cache` to force revalidation on every request.
+"""
+
+
+def make_etag(*parts):
+    """
+    Build a strong ETag from the values that determine a representation.
+
+    Args:
+        *parts: Values such as IDs and modification timestamps.
+
+    Returns:
+        str: A quoted entity tag, e.g. `"3f2a..."`.
+    """
+    digest = hashlib.sha1(repr(parts).encode("utf-8")).hexdigest()
+    return f'"{digest}"'
+
+
+def http_date(value):
+    """
+    Format a naive UTC datetime as an HTTP date (e.g. `Mon, 26 May 2025 20:17:16 GMT`).
+    """
+    return format_datetime(value.replace(tzinfo=timezone.utc), usegmt=True)
+
+
+def is_not_modified(request: Request, etag: str, last_modified=None):
+    """
+    Check whether the client's cached copy is still current.
+
+    Args:
+        request (Request): The incoming request.
+        etag (str): The current entity tag of the resource.
+        last_modified (datetime): The current modification time of the resource, if known.
+
+    Returns:
+        bool: True if a `304 Not Modified` response should be sent.
+
+    `If-None-Match` takes precedence over `If-Modified-Since`, as required by RFC 9110.
+    Entity tags are compared weakly, which is the rule for `GET` requests.
+    """
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+        return "*" in tags or etag in tags
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and last_modified is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        if since.tzinfo is None:
+            # `-0000` and zone-less dates parse as naive; HTTP dates are always UTC.
+            since = since.replace(tzinfo=timezone.utc)
+        return last_modified.replace(tzinfo=timezone.utc, microsecond=0) <= since
+    return False
+
+
+def set_headers(response: Response, policy: str, etag: str, last_modified=None):
+    """
+    Attach the validators and caching policy to a response.
+
+    Args:
+        response (Response): The response to modify.
+        policy (str): A key of `CACHE_CONTROL`.
+        etag (str): The entity tag of the resource.
+        last_modified (datetime): The modification time of the resource, if known.
+
+    Returns:
+        Response: The same response.
+    """
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = CACHE_CONTROL[policy]
+    if last_modified is not None:
+        response.headers["Last-Modified"] = http_date(last_modified)
+    return response
+
+
+def not_modified(policy: str, etag: str, last_modified=None):
+    """
+    Build an empty `304 Not Modified` response carrying the current validators.
+
+    Args:
+        policy (str): A key of `CACHE_CONTROL`.
+        etag (str): The entity tag of the resource.
+        last_modified (datetime): The modification time of the resource, if known.
+
+    Returns:
+        Response: The 304 response.
+    """
+    return set_headers(Response(status_code=304), policy, etag, last_modified)
@@ -0,0 +1,165 @@
+import sys
+import zlib
+from sqlalchemy import Text, bindparam, case, func, update
+from sqlalchemy.types import TypeDecorator
+
+COMPRESS_POST_CONTENT = False
+"""
+Enables compressed storage of post bodies.
+- When False (the default), bodies are written as plain text, exactly as before.
+- When True, bodies longer than `COMPRESSION_THRESHOLD` bytes are stored zlib-compressed.
+- Rows are always readable in both forms, so the mode can be switched at any time;
+  run `python -m app.compression` afterwards to rewrite existing rows.
+"""
+
+COMPRESSION_THRESHOLD = 1024
+"""
+The minimum size, in UTF-8 bytes, of a body worth compressing.
+- Short bodies gain little from zlib and pay its header overhead, so they are stored as text.
+"""
+
+COMPRESSION_LEVEL = 6
+"""
+The zlib compression level (1 = fastest, 9 = smallest).
+"""
+
+
+def compress(value: str):
+    """
+    Compress a text value if it is large enough to benefit.
+
+    Args:
+        value (str): The text to store.
+
+    Returns:
+        str | bytes: The zlib-compressed UTF-8 bytes, or the original text if it is
+        below `COMPRESSION_THRESHOLD` or would not get smaller.
+    """
+    data = value.encode("utf-8")
+    if len(data) < COMPRESSION_THRESHOLD:
+        return value
+    packed = zlib.compress(data, COMPRESSION_LEVEL)
+    return packed if len(packed) < len(data) else value
+
+
+def inflate(value):
+    """
+    Decode a stored value back to text.
+
+    Args:
+        value (str | bytes | None): A value read from a compressed column.
+
+    Returns:
+        str | None: The original text. Compressed values are stored as BLOBs and are
+        decompressed; plain text is returned unchanged.
+    """
+    if isinstance(value, bytes):
+        return zlib.decompress(value).decode("utf-8")
+    return value
+
+
+class CompressedText(TypeDecorator):
+    """
+    A text column type that transparently compresses large values.
+
+    Values are stored as plain TEXT unless `COMPRESS_POST_CONTENT` is enabled and
+    the value is at least `COMPRESSION_THRESHOLD` bytes long, in which case the
+    zlib-compressed bytes are stored as a BLOB in the same column. SQLite keeps the
+    storage class per value, so reads tell the two forms apart without a marker and
+    the schema does not change.
+    """
+    impl = Text
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is None or not COMPRESS_POST_CONTENT:
+            return value
+        return compress(value)
+
+    def process_result_value(self, value, dialect):
+        return inflate(value)
+
+    def coerce_compared_value(self, op, value):
+        # Compare against plain text so that search patterns are never compressed.
+        return Text()
+
+
+def searchable(column):
+    """
+    Return an expression over the text of a possibly compressed column.
+
+    Args:
+        column: A column using `CompressedText`.
+
+    Returns:
+        `CASE WHEN typeof(column) = 'blob' THEN inflate(column) ELSE column END`.
+
+    The choice is made per row, not from `COMPRESS_POST_CONTENT`: a table can hold
+    both forms whatever the current write mode is, until `compact_posts` has run.
+    Plain rows are matched by SQLite directly; only compressed ones pay for the call
+    into Python. The SQL function is registered by `app.database.register_sqlite_functions`.
+    """
+    return case((func.typeof(column) == "blob", func.inflate(column, type_=Text)), else_=column)
+
+
+def compact_posts(db, chunk_size: int = 500):
+    """
+    Rewrite stored post bodies to match the current compression settings.
+
+    Args:
+        db (Session): The database session to use.
+        chunk_size (int): The number of posts rewritten per transaction.
+
+    Returns:
+        int: The number of posts rewritten.
+
+    Every body is read back as text and written again through `CompressedText`, so
+    this compresses existing rows after `COMPRESS_POST_CONTENT` has been enabled and
+    decompresses them after it has been disabled. Each chunk is committed on its own
+    to keep the write lock short. `updated_at` is left unchanged, since the text is.
+    """
+    from app import models
+
+    table = models.Post.__table__
+    statement = (
+        update(table)
+        .where(table.c.id == bindparam("post_id"))
+        .values(content=bindparam("post_content"), updated_at=table.c.updated_at)
+    )
+    last_id = 0
+    rewritten = 0
+    while True:
+        rows = db.execute(
+            table.select()
+            .with_only_columns(table.c.id, table.c.content)
+            .where(table.c.id > last_id)
+            .order_by(table.c.id)
+            .limit(chunk_size)
+        ).all()
+        if not rows:
+            break
+        db.execute(statement, [{"post_id": row.id, "post_content": row.content} for row in rows])
+        db.commit()
+        last_id = rows[-1].id
+        rewritten += len(rows)
+    return rewritten
+
+
+if __name__ == "__main__":
+    from sqlalchemy.orm import Session
+    from app import compression
+    from app.database import engine, shard_engines
+
+    # Settings are read from the imported module that the models use, not from `__main__`.
+    if "--compress" in sys.argv:
+        compression.COMPRESS_POST_CONTENT = True
+    elif "--decompress" in sys.argv:
+        compression.COMPRESS_POST_CONTENT = False
+    count = 0
+    for target in [engine, *shard_engines.values()]:
+        with Session(bind=target) as db:
+            count += compression.compact_posts(db)
+        with target.connect() as connection:
+            connection.exec_driver_sql("VACUUM")
+    state = "on" if compression.COMPRESS_POST_CONTENT else "off"
+    print(f"Rewrote {count} posts (compression {state}) and vacuumed the database.")
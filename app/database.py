@@ -1,5 +1,8 @@
-from sqlalchemy import create_engine
+import zlib
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.horizontal_shard import ShardedSession, set_shard_id
 from sqlalchemy.orm import sessionmaker, declarative_base
+from app.sql_functions import SQL_FUNCTIONS
 
 # Define the database URL for the SQLite database
 SQLALCHEMY_DATABASE_URL = "sqlite:///./blog.db"
@@ -16,13 +19,204 @@ The `engine` is the core interface to the database.
 - `connect_args={"check_same_thread": False}`: This argument is specific to SQLite and allows multiple threads to use the same database connection.
 """
 
+def enable_sqlite_foreign_keys(dbapi_connection, connection_record):
+    """
+    Turn on foreign key enforcement for every new SQLite connection.
+
+    SQLite ships with foreign key checks disabled and the setting is per connection,
+    so it has to be applied each time the pool opens one. Without it the
+    `ON DELETE CASCADE` clauses on the models are ignored and deleting a post
+    leaves its comments orphaned.
+    """
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA foreign_keys=ON")
+    cursor.close()
+
+def register_sqlite_functions(dbapi_connection, connection_record):
+    """
+    Register the application's SQL functions (`app.sql_functions.SQL_FUNCTIONS`) on
+    every new SQLite connection.
+
+    Like foreign key enforcement, functions are per connection, so this is attached
+    to each engine of the application rather than to every SQLAlchemy engine.
+    """
+    for name, (arity, function) in SQL_FUNCTIONS.items():
+        dbapi_connection.create_function(name, arity, function, deterministic=True)
+
+event.listen(engine, "connect", enable_sqlite_foreign_keys)
+event.listen(engine, "connect", register_sqlite_functions)
+
+# Sharded storage settings
+SHARD_COUNT = 0
+"""
+The number of SQLite files that posts and comments are partitioned across.
+- `0` (the default) disables sharding: everything lives in `blog.db`, as before.
+- With `N > 0`, posts and their comments are stored in `N` shard files chosen by the
+  post owner's bucket, while users stay in `blog.db` (the global shard). Each file
+  has its own write lock, so writes for different owners no longer queue behind each other.
+- After changing this value, run `python -m app.sharding rebalance` to move existing rows.
+"""
+
+SHARD_DATABASE_URL = "sqlite:///./blog_shard_{index}.db"
+"""
+The connection URL template for shard files; `{index}` is replaced by the shard number.
+"""
+
+BUCKET_COUNT = 256
+"""
+The fixed number of buckets owners are hashed into.
+- Buckets, not owners, are assigned to shards (`bucket % SHARD_COUNT`), so changing
+  `SHARD_COUNT` only moves whole buckets.
+- Post and comment IDs encode their bucket (`id % BUCKET_COUNT`), so a post can be
+  located from its ID alone. This value must never change once sharding is in use.
+"""
+
+GLOBAL_SHARD = "global"
+"""
+The shard identifier of `blog.db`, which holds the users table.
+"""
+
+shard_engines = {
+    f"shard_{index}": create_engine(SHARD_DATABASE_URL.format(index=index), connect_args={"check_same_thread": False})
+    for index in range(SHARD_COUNT)
+}
+"""
+The engines of the post shards, keyed by shard identifier (`shard_0`, `shard_1`, ...).
+- Routing reads the shard count from this dict rather than from `SHARD_COUNT`, so it is
+  the one place that decides whether (and how) posts are sharded.
+"""
+
+for shard_engine in shard_engines.values():
+    event.listen(shard_engine, "connect", enable_sqlite_foreign_keys)
+    event.listen(shard_engine, "connect", register_sqlite_functions)
+
+def bucket_for_owner(owner_id: int):
+    """
+    Return the bucket of a post owner.
+
+    Args:
+        owner_id (int): The ID of the user owning the post.
+
+    Returns:
+        int: A stable bucket number in `range(BUCKET_COUNT)`.
+    """
+    return zlib.crc32(str(owner_id).encode("ascii")) % BUCKET_COUNT
+
+def shard_for_bucket(bucket: int, shard_count: int = None):
+    """
+    Return the shard identifier that stores a bucket.
+
+    Args:
+        bucket (int): A bucket number.
+        shard_count (int): The number of shards (default: the number of `shard_engines`).
+
+    Returns:
+        str: The shard identifier, e.g. `shard_2`.
+    """
+    return f"shard_{bucket % (shard_count or len(shard_engines))}"
+
+def shard_for_owner(owner_id: int):
+    """
+    Return the shard identifier that stores the posts of a user.
+    """
+    return shard_for_bucket(bucket_for_owner(owner_id))
+
+def shard_for_post(post_id: int):
+    """
+    Return the shard identifier that stores a post, from its ID alone.
+
+    Comment IDs encode the bucket of their post in the same way, so this also
+    locates comments by ID.
+    """
+    return shard_for_bucket(post_id % BUCKET_COUNT)
+
+def _shard_chooser(mapper, instance, clause=None):
+    """
+    Choose the shard a new or modified object is written to.
+
+    Users go to the global shard. Posts go to their owner's shard and comments
+    to their post's shard.
+    """
+    table = mapper.local_table.name if mapper is not None else None
+    if instance is not None and table == "posts":
+        return shard_for_owner(instance.owner_id)
+    if instance is not None and table == "comments":
+        return shard_for_post(instance.post_id)
+    return GLOBAL_SHARD
+
+def _identity_chooser(mapper, primary_key, *, lazy_loaded_from, execution_options, bind_arguments, **kw):
+    """
+    Choose the shards to search for an object by primary key.
+
+    Post and comment IDs encode their shard; everything else is global.
+    """
+    if mapper.local_table.name in ("posts", "comments"):
+        return [shard_for_post(primary_key[0])]
+    return [GLOBAL_SHARD]
+
+def _execute_chooser(orm_context):
+    """
+    Choose the shards a statement runs against when no shard was set explicitly.
+
+    - Statements on users run against the global shard.
+    - Lazy loads of posts and comments run against the shard of the parent object.
+    - Other statements on posts and comments fan out to every post shard; results
+      are concatenated, so callers that need an order merge them themselves (see
+      `app.sharding`).
+    """
+    mapper = orm_context.bind_mapper
+    if mapper is None or mapper.local_table.name not in ("posts", "comments"):
+        return [GLOBAL_SHARD]
+    if orm_context.is_select and orm_context.lazy_loaded_from is not None:
+        return [orm_context.lazy_loaded_from.identity_token]
+    return list(shard_engines)
+
+def _route_users_to_global(orm_context):
+    """
+    Run every query on users against the global shard.
+
+    Relationship loaders (e.g. `Post.owner`, `Comment.author`) started from a shard
+    query would otherwise inherit that shard, which has no users table.
+    """
+    mapper = orm_context.bind_mapper
+    if orm_context.is_select and mapper is not None and mapper.local_table.name == "users":
+        orm_context.statement = orm_context.statement.options(set_shard_id(GLOBAL_SHARD))
+
+def sharded_sessionmaker(global_engine):
+    """
+    Create a factory for sessions spanning the global shard and the post shards.
+
+    Args:
+        global_engine (Engine): The engine of the database holding the users table.
+
+    Returns:
+        sessionmaker: A factory for `ShardedSession`s over `global_engine` and the
+        current `shard_engines`, routing statements with the choosers above.
+    """
+    factory = sessionmaker(
+        class_=ShardedSession,
+        autocommit=False,
+        autoflush=False,
+        shards={GLOBAL_SHARD: global_engine, **shard_engines},
+        shard_chooser=_shard_chooser,
+        identity_chooser=_identity_chooser,
+        execute_chooser=_execute_chooser,
+    )
+    event.listen(factory, "do_orm_execute", _route_users_to_global)
+    return factory
+
 # Create a session factory
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+if SHARD_COUNT:
+    SessionLocal = sharded_sessionmaker(engine)
+else:
+    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 """
 The `SessionLocal` is a factory for creating database sessions.
 - `autocommit=False`: Disables automatic commits; transactions must be explicitly committed.
 - `autoflush=False`: Disables automatic flushing of changes to the database; changes are flushed only when explicitly committed.
 - `bind=engine`: Binds the session to the database engine, so all sessions created by this factory will use the same database connection.
+- When `SHARD_COUNT` is set, sessions are `ShardedSession`s that route every statement to
+  the global shard or to the post shards (see `sharded_sessionmaker`).
 """
 
 # Create a base class for the ORM models
@@ -31,4 +225,4 @@ Base = declarative_base()
 The `Base` class is the declarative base for all ORM models.
 - Models will inherit from this class to define database tables.
 - This base class provides metadata and functionality for mapping Python classes to database tables.
-"""
\ No newline at end of file
+"""
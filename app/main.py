@@ -1,6 +1,8 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
-from app import models
+from app import models, sharding, trending
 from app.database import engine
+from app.migrations import upgrade_schema
 from routers import users, posts, comments
 
 # Create all database tables
@@ -12,12 +14,36 @@ This line ensures that all database tables defined in the ORM models are created
 - `engine`: The database connection engine used to execute the table creation commands.
 """
 
+# Upgrade tables created by earlier versions of the models
+upgrade_schema()
+"""
+This line brings an existing database in line with the ORM models.
+- `create_all` never alters tables that already exist.
+- `upgrade_schema()`: Adds missing columns and indexes, and rebuilds tables whose foreign keys lack `ON DELETE CASCADE`.
+"""
+
+# Create the post and comment tables in the shard files, if sharding is enabled
+sharding.create_shard_tables()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Run background work for the lifetime of the application.
+
+    - On startup, starts the thread that flushes buffered post views and refreshes the trending list.
+    - On shutdown, stops it and flushes any views still in memory.
+    """
+    trending.start()
+    yield
+    trending.stop()
+
 # Initialize the FastAPI application
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 """
 The `app` object is an instance of the FastAPI class.
 - It serves as the main entry point for the application.
 - Routes, middleware, and other configurations are added to this object.
+- `lifespan`: Starts and stops the background view flusher.
 """
 
 # Include the user-related routes
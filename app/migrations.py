@@ -0,0 +1,184 @@
+import logging
+import sys
+from sqlalchemy import MetaData, inspect
+from sqlalchemy.schema import CreateColumn, CreateIndex, CreateTable
+from app import models
+from app.database import Base, engine
+
+logger = logging.getLogger(__name__)
+
+
+def _needs_rebuild(table, inspector):
+    """
+    Check whether an existing table's foreign keys differ from the model.
+
+    Args:
+        table (Table): The table as declared by the ORM models.
+        inspector (Inspector): An inspector bound to the live database.
+
+    Returns:
+        bool: True if a foreign key's `ON DELETE` action does not match the model.
+
+    SQLite cannot alter a constraint in place, so a mismatch means the table has
+    to be rebuilt.
+    """
+    declared = {
+        (fk.parent.name, fk.column.table.name): (fk.ondelete or "").upper()
+        for fk in table.foreign_keys
+    }
+    for fk in inspector.get_foreign_keys(table.name):
+        key = (fk["constrained_columns"][0], fk["referred_table"])
+        existing = (fk.get("options", {}).get("ondelete") or "").upper()
+        if key in declared and declared[key] != existing:
+            return True
+    return False
+
+
+def _rebuild_table(dbapi_connection, table, existing_columns):
+    """
+    Rebuild a table so that it matches its model definition.
+
+    Args:
+        dbapi_connection: A raw SQLite connection in autocommit mode.
+        table (Table): The table as declared by the ORM models.
+        existing_columns (set[str]): The column names present in the live table.
+
+    Returns:
+        list[tuple]: The rows of `PRAGMA foreign_key_check` that violate the new
+        constraints; empty if the table was rebuilt.
+
+    This follows SQLite's documented procedure for schema changes that `ALTER TABLE`
+    cannot express: create the new table under a temporary name, copy the rows,
+    drop the old table, rename the new one, recreate its indexes and run
+    `PRAGMA foreign_key_check` before committing. Foreign key checks are disabled
+    for the duration so that dropping the old table does not cascade into its
+    children. If the copied rows reference missing parents, the rebuild is rolled
+    back and the table is left as it was.
+    """
+    scratch = MetaData()
+    for other in Base.metadata.sorted_tables:
+        other.to_metadata(scratch)
+    temp_table = scratch.tables[table.name].to_metadata(scratch, name=f"_{table.name}_new")
+    columns = ", ".join(c.name for c in table.columns if c.name in existing_columns)
+
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA foreign_keys=OFF")
+    try:
+        cursor.execute("BEGIN")
+        cursor.execute(str(CreateTable(temp_table).compile(dialect=engine.dialect)))
+        cursor.execute(f"INSERT INTO {temp_table.name} ({columns}) SELECT {columns} FROM {table.name}")
+        cursor.execute(f"DROP TABLE {table.name}")
+        cursor.execute(f"ALTER TABLE {temp_table.name} RENAME TO {table.name}")
+        for index in table.indexes:
+            cursor.execute(str(CreateIndex(index).compile(dialect=engine.dialect)))
+        violations = cursor.execute(f"PRAGMA foreign_key_check({table.name})").fetchall()
+        cursor.execute("ROLLBACK" if violations else "COMMIT")
+        return violations
+    except Exception:
+        cursor.execute("ROLLBACK")
+        raise
+    finally:
+        cursor.execute("PRAGMA foreign_keys=ON")
+        cursor.close()
+
+
+def _add_missing_columns(dbapi_connection, table, existing_columns):
+    """
+    Add columns declared on the model but missing from the live table.
+
+    Args:
+        dbapi_connection: A raw SQLite connection in autocommit mode.
+        table (Table): The table as declared by the ORM models.
+        existing_columns (set[str]): The column names present in the live table.
+
+    New columns are added with `ALTER TABLE ... ADD COLUMN`, which SQLite supports
+    for nullable columns without a rebuild.
+    """
+    cursor = dbapi_connection.cursor()
+    for column in table.columns:
+        if column.name not in existing_columns:
+            ddl = CreateColumn(column).compile(dialect=engine.dialect)
+            cursor.execute(f"ALTER TABLE {table.name} ADD COLUMN {ddl}")
+    cursor.close()
+
+
+def upgrade_indexes(bind, metadata=Base.metadata):
+    """
+    Bring the indexes of existing tables in line with their declarations.
+
+    Args:
+        bind (Engine): The database to upgrade.
+        metadata (MetaData): The declared tables (default: the ORM models).
+
+    Missing indexes are created. Indexes that follow the `ix_<table>_` naming of the
+    models but are no longer declared are dropped, so that a replaced index (such as
+    the full `ix_posts_deleted_at`, superseded by the partial `ix_posts_tombstones`)
+    cannot still be picked by the query planner. Other indexes are left alone.
+    """
+    inspector = inspect(bind)
+    with bind.begin() as connection:
+        for table in metadata.sorted_tables:
+            declared = {index.name for index in table.indexes}
+            for index in inspector.get_indexes(table.name):
+                if index["name"].startswith(f"ix_{table.name}_") and index["name"] not in declared:
+                    connection.exec_driver_sql(f"DROP INDEX {index['name']}")
+            for index in table.indexes:
+                connection.execute(CreateIndex(index, if_not_exists=True))
+
+
+def upgrade_schema(bind=None):
+    """
+    Bring an existing database in line with the ORM models.
+
+    `Base.metadata.create_all` only creates missing tables; it never alters tables
+    that already exist. This function fills the gap for the changes the models have
+    picked up since `blog.db` was first created:
+    - Tables whose foreign keys lack the declared `ON DELETE` action are rebuilt.
+    - Missing columns are added in place.
+    - Indexes are synchronised with the models (see `upgrade_indexes`).
+
+    It is safe to call on every startup; a database that is already up to date is
+    left untouched.
+
+    Args:
+        bind (Engine): The database to upgrade (default: `blog.db`).
+
+    Returns:
+        dict[str, list[tuple]]: The tables that could not be rebuilt because existing
+        rows violate their foreign keys, with the `PRAGMA foreign_key_check` rows.
+        Those tables keep their old constraints (but gain missing columns) and are
+        retried on the next call, once the offending rows have been fixed or removed.
+    """
+    bind = bind or engine
+    Base.metadata.create_all(bind=bind)
+    inspector = inspect(bind)
+    raw = bind.raw_connection()
+    dbapi_connection = raw.driver_connection
+    isolation_level = dbapi_connection.isolation_level
+    dbapi_connection.isolation_level = None
+    skipped = {}
+    try:
+        for table in Base.metadata.sorted_tables:
+            existing_columns = {c["name"] for c in inspector.get_columns(table.name)}
+            if _needs_rebuild(table, inspector):
+                violations = _rebuild_table(dbapi_connection, table, existing_columns)
+                if violations:
+                    skipped[table.name] = violations
+                    logger.warning(
+                        "Not rebuilding %s: %d rows violate its foreign keys (table, rowid, parent, fk): %s",
+                        table.name, len(violations), violations,
+                    )
+                    _add_missing_columns(dbapi_connection, table, existing_columns)
+            else:
+                _add_missing_columns(dbapi_connection, table, existing_columns)
+    finally:
+        dbapi_connection.isolation_level = isolation_level
+        raw.close()
+    upgrade_indexes(bind)
+    return skipped
+
+
+if __name__ == "__main__":
+    logging.basicConfig()
+    if upgrade_schema():
+        sys.exit("Some tables were not upgraded; fix or delete the rows listed above and run again.")
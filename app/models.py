@@ -1,6 +1,7 @@
-from sqlalchemy import Column, Integer, String, Text, ForeignKey, DateTime
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, Float, String, Text, ForeignKey, DateTime, Index, text
+from sqlalchemy.orm import deferred, relationship
 from datetime import datetime
+from app.compression import CompressedText
 from app.database import Base
 
 class User(Base):
@@ -14,8 +15,9 @@ class User(Base):
         password (str): The hashed password of the user.
 
     Relationships:
-        posts (list[Post]): A list of posts created by the user.
-        comments (list[Comment]): A list of comments authored by the user.
+        posts (list[Post]): A list of posts created by the user, deleted along with the user.
+        comments (list[Comment]): A list of comments authored by the user, deleted along with the user.
+        refresh_tokens (list[RefreshToken]): The refresh tokens issued to the user, deleted along with the user.
 
     This model represents the `users` table in the database. It defines the
     columns and relationships for storing user data.
@@ -26,8 +28,11 @@ class User(Base):
     email = Column(String, unique=True, index=True)
     password = Column(String)
 
-    posts = relationship("Post", back_populates="owner")
-    comments = relationship("Comment", back_populates="author")
+    posts = relationship("Post", back_populates="owner", cascade="all, delete-orphan", passive_deletes=True)
+    comments = relationship("Comment", back_populates="author", cascade="all, delete-orphan", passive_deletes=True)
+    refresh_tokens = relationship(
+        "RefreshToken", back_populates="user", cascade="all, delete-orphan", passive_deletes=True
+    )
 
 class Post(Base):
     """
@@ -38,24 +43,58 @@ class Post(Base):
         title (str): The title of the blog post.
         content (str): The content of the blog post.
         created_at (datetime): The timestamp when the post was created.
+        updated_at (datetime): The timestamp when the post was last changed; set on insert, so it is
+            only `None` for posts created before the column was added.
+        deleted_at (datetime): The timestamp when the post was soft-deleted, or `None` if it is live.
+        views (int): The number of times the post has been read, flushed in batches by `app.trending`.
+        trending_score (float): The time-decayed view score used to rank trending posts, or `None` if never viewed.
         owner_id (int): The ID of the user who owns the post.
 
     Relationships:
         owner (User): The user who created the post.
-        comments (list[Comment]): A list of comments associated with the post.
+        comments (list[Comment]): A list of comments associated with the post, deleted along with the post.
+
+    `content` is deferred: it is only read (and decompressed, see `CompressedText`)
+    when it is accessed or explicitly undeferred, so queries that only need titles
+    and owners do not pull the bodies into memory.
+
+    Foreign keys are declared with `ON DELETE CASCADE`, so bulk deletes that bypass
+    the ORM still remove dependent rows at the database level.
+
+    The composite index on `(created_at, id)` serves the ordered per-shard reads of
+    `app.sharding.paginate` and `gather`, and the date-range filters of bulk jobs.
+    The index on `deleted_at` only covers tombstoned posts: it serves the purge job,
+    and it cannot be picked for the `deleted_at IS NULL` filter of live reads, which
+    would otherwise make SQLite sort every live post instead of walking `(created_at, id)`.
 
     This model represents the `posts` table in the database. It defines the
     columns and relationships for storing blog post data.
     """
     __tablename__ = "posts"
+    __table_args__ = (
+        Index("ix_posts_created_at_id", "created_at", "id"),
+        Index("ix_posts_tombstones", "deleted_at", sqlite_where=text("deleted_at IS NOT NULL")),
+    )
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String, index=True)
-    content = Column(Text)
+    content = deferred(Column(CompressedText))
     created_at = Column(DateTime, default=datetime.utcnow)
-    owner_id = Column(Integer, ForeignKey("users.id"))
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    deleted_at = Column(DateTime, nullable=True)
+    views = Column(Integer, nullable=False, default=0, server_default="0")
+    trending_score = Column(Float, nullable=True, index=True)
+    owner_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), index=True)
+
+    @property
+    def last_modified(self):
+        """
+        The time of the last change to the post, falling back to `created_at` for
+        rows written before `updated_at` existed.
+        """
+        return self.updated_at or self.created_at
 
     owner = relationship("User", back_populates="posts")
-    comments = relationship("Comment", back_populates="post")
+    comments = relationship("Comment", back_populates="post", cascade="all, delete-orphan", passive_deletes=True)
 
 class Comment(Base):
     """
@@ -64,6 +103,7 @@ class Comment(Base):
     Attributes:
         id (int): The unique identifier for the comment.
         content (str): The content of the comment.
+        created_at (datetime): The timestamp when the comment was created.
         post_id (int): The ID of the post to which the comment belongs.
         author_id (int): The ID of the user who authored the comment.
 
@@ -77,8 +117,41 @@ class Comment(Base):
     __tablename__ = "comments"
     id = Column(Integer, primary_key=True, index=True)
     content = Column(Text)
-    post_id = Column(Integer, ForeignKey("posts.id"))
-    author_id = Column(Integer, ForeignKey("users.id"))
+    created_at = Column(DateTime, default=datetime.utcnow)
+    post_id = Column(Integer, ForeignKey("posts.id", ondelete="CASCADE"), index=True)
+    author_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), index=True)
 
     post = relationship("Post", back_populates="comments")
-    author = relationship("User", back_populates="comments")
\ No newline at end of file
+    author = relationship("User", back_populates="comments")
+
+class RefreshToken(Base):
+    """
+    Database model for refresh tokens.
+
+    Attributes:
+        id (int): The unique identifier for the refresh token.
+        user_id (int): The ID of the user the token was issued to.
+        token_hash (str): The SHA-256 hex digest of the token; the token itself is never stored.
+        created_at (datetime): The timestamp when the token was issued.
+        expires_at (datetime): The timestamp after which the token is no longer accepted.
+        revoked_at (datetime): The timestamp when the token was used or revoked, or `None` if it is live.
+
+    Relationships:
+        user (User): The user the token was issued to.
+
+    Tokens are random 256-bit values, so a single unsalted SHA-256 is enough to keep
+    a leaked table from being replayed, and a refresh costs one lookup through the
+    unique index on `token_hash` instead of a bcrypt verify. Used tokens are kept
+    (revoked) until they expire, so that a replayed token can be detected.
+
+    This model represents the `refresh_tokens` table in the database.
+    """
+    __tablename__ = "refresh_tokens"
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    token_hash = Column(String(64), nullable=False, unique=True, index=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    expires_at = Column(DateTime, nullable=False)
+    revoked_at = Column(DateTime, nullable=True)
+
+    user = relationship("User", back_populates="refresh_tokens")
@@ -43,6 +43,30 @@ class UserOut(BaseModel):
     class Config:
         from_attributes = True  # Enables compatibility with ORM models.
 
+class Token(BaseModel):
+    """
+    Schema for returning the tokens issued by login and refresh.
+
+    Attributes:
+        access_token (str): A short-lived JWT to send as a bearer token.
+        refresh_token (str): An opaque, single-use token to exchange for new tokens.
+        token_type (str): Always "bearer".
+        expires_in (int): The lifetime of the access token, in seconds.
+    """
+    access_token: str
+    refresh_token: str
+    token_type: str = "bearer"
+    expires_in: int
+
+class TokenRefresh(BaseModel):
+    """
+    Schema for exchanging a refresh token.
+
+    Attributes:
+        refresh_token (str): The refresh token returned by the last login or refresh.
+    """
+    refresh_token: str
+
 # Post-related schemas
 
 class PostBase(BaseModel):
@@ -67,27 +91,77 @@ class PostCreate(PostBase):
     """
     pass
 
-class PostOut(BaseModel):
+class PostSummary(BaseModel):
     """
-    Schema for returning blog post data in responses.
+    Schema for returning blog post metadata without the body.
 
     Attributes:
         id (int): The unique identifier of the blog post.
         title (str): The title of the blog post.
-        content (str): The content of the blog post.
         created_at (datetime): The timestamp when the blog post was created.
         owner (UserOut): The user who created the blog post.
 
-    This schema is used to serialize blog post data for responses, including the owner details.
+    This schema is used by the list and search endpoints when `include_content=false`,
+    so that post bodies are neither loaded nor sent.
     """
     id: int
     title: str
-    content: str
     created_at: datetime
     owner: UserOut
     class Config:
         from_attributes = True  # Enables compatibility with ORM models.
 
+class PostOut(PostSummary):
+    """
+    Schema for returning blog post data in responses.
+
+    Attributes:
+        id (int): The unique identifier of the blog post.
+        title (str): The title of the blog post.
+        content (str): The content of the blog post.
+        created_at (datetime): The timestamp when the blog post was created.
+        owner (UserOut): The user who created the blog post.
+
+    This schema is used to serialize blog post data for responses, including the owner details.
+    """
+    content: str
+
+class TrendingPostOut(PostSummary):
+    """
+    Schema for returning a trending blog post.
+
+    Attributes:
+        views (int): The number of times the post has been read, as of the last flush.
+
+    This schema extends `PostSummary` and is used by the trending endpoint.
+    """
+    views: int
+
+class BulkJobOut(BaseModel):
+    """
+    Schema for returning the progress of a bulk post operation.
+
+    Attributes:
+        id (str): The unique identifier of the job.
+        kind (str): The type of job ("delete", "soft_delete", "purge" or "delete_user").
+        status (str): The job state ("pending", "running", "completed" or "failed").
+        total (int): The number of posts matched when the job started.
+        processed (int): The number of posts processed so far.
+        created_at (datetime): The timestamp when the job was submitted.
+        finished_at (Optional[datetime]): The timestamp when the job finished, if it has.
+        error (Optional[str]): The error message if the job failed.
+
+    This schema is used to report on jobs started by the bulk delete, purge and user deletion endpoints.
+    """
+    id: str
+    kind: str
+    status: str
+    total: int
+    processed: int
+    created_at: datetime
+    finished_at: Optional[datetime] = None
+    error: Optional[str] = None
+
 # Comment-related schemas
 
 class CommentCreate(BaseModel):
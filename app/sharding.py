@@ -0,0 +1,355 @@
+import heapq
+import os
+import sys
+from datetime import datetime
+from itertools import islice
+from sqlalchemy import Column, Integer, MetaData, Table, create_engine, delete, event, insert, select
+from sqlalchemy.engine import make_url
+from sqlalchemy.orm import joinedload, selectinload
+from app import models
+from app.database import (
+    BUCKET_COUNT,
+    SHARD_DATABASE_URL,
+    bucket_for_owner,
+    enable_sqlite_foreign_keys,
+    register_sqlite_functions,
+    engine,
+    shard_engines,
+    shard_for_owner,
+    shard_for_post,
+)
+from app.migrations import upgrade_indexes
+
+shard_metadata = MetaData()
+"""
+The schema of a shard file.
+- Contains `posts` and `comments` as declared on the models, minus the foreign keys to
+  `users`, which live in the global shard and cannot be referenced across files.
+- Contains `id_sequence`, the per-shard counter used to allocate post and comment IDs.
+"""
+
+sequence_table = Table(
+    "id_sequence",
+    shard_metadata,
+    Column("id", Integer, primary_key=True),
+    sqlite_autoincrement=True,
+)
+
+for _table in (models.User.__table__, models.Post.__table__, models.Comment.__table__):
+    _table.to_metadata(shard_metadata)
+for _name in ("posts", "comments"):
+    _table = shard_metadata.tables[_name]
+    for _constraint in list(_table.foreign_key_constraints):
+        if _constraint.referred_table.name == "users":
+            for _element in _constraint.elements:
+                _element.parent.foreign_keys.discard(_element)
+            _table.constraints.discard(_constraint)
+shard_metadata.remove(shard_metadata.tables["users"])
+
+shard_posts = shard_metadata.tables["posts"]
+shard_comments = shard_metadata.tables["comments"]
+
+
+def is_sharded():
+    """
+    Return whether posts and comments are stored in shard files (see `app.database.SHARD_COUNT`).
+    """
+    return bool(shard_engines)
+
+
+def create_shard_tables():
+    """
+    Create the tables and indexes of every configured shard file that does not have them yet.
+    """
+    for shard_engine in shard_engines.values():
+        shard_metadata.create_all(bind=shard_engine)
+        upgrade_indexes(shard_engine, shard_metadata)
+
+
+def allocate_id(connection, bucket: int):
+    """
+    Allocate a new post or comment ID in a shard.
+
+    Args:
+        connection (Connection): A connection to the shard, inside the inserting transaction.
+        bucket (int): The owner bucket the row belongs to.
+
+    Returns:
+        int: An ID whose remainder modulo `BUCKET_COUNT` is `bucket`.
+
+    The sequence is an `AUTOINCREMENT` table, so values are never reused even though
+    the row is deleted straight away. IDs from different shards never collide because
+    a bucket is only ever written on one shard at a time.
+    """
+    sequence = connection.execute(insert(sequence_table)).inserted_primary_key[0]
+    connection.execute(delete(sequence_table))
+    return sequence * BUCKET_COUNT + bucket
+
+
+def _advance_sequence(connection, ids):
+    """
+    Make sure a shard's sequence is past the given IDs, after rows were moved in.
+    """
+    if not ids:
+        return
+    connection.execute(insert(sequence_table).prefix_with("OR IGNORE").values(id=max(ids) // BUCKET_COUNT))
+    connection.execute(delete(sequence_table))
+
+
+def _assign_post_id(mapper, connection, target):
+    if target.id is None and is_sharded():
+        target.id = allocate_id(connection, bucket_for_owner(target.owner_id))
+
+
+def _assign_comment_id(mapper, connection, target):
+    if target.id is None and is_sharded():
+        target.id = allocate_id(connection, target.post_id % BUCKET_COUNT)
+
+
+event.listen(models.Post, "before_insert", _assign_post_id)
+event.listen(models.Comment, "before_insert", _assign_comment_id)
+
+
+def on_shard(query, shard_id: str):
+    """
+    Restrict a query to one shard.
+
+    Args:
+        query (Query): A query over posts or comments.
+        shard_id (str): The shard identifier.
+
+    Returns:
+        Query: The query, pinned to the shard when sharding is enabled.
+    """
+    if not is_sharded():
+        return query
+    # An execution option rather than `set_shard_id`: loaders copy statement options,
+    # and the owners of sharded posts have to be loaded from the global shard.
+    return query.execution_options(identity_token=shard_id)
+
+
+def for_post(query, post_id: int):
+    """
+    Restrict a query to the shard that stores the given post.
+    """
+    if not is_sharded():
+        return query
+    return on_shard(query, shard_for_post(post_id))
+
+
+def owner_loader():
+    """
+    Return the loader option for `Post.owner`.
+
+    Returns:
+        A `joinedload`, or a `selectinload` when sharded: users live in the global
+        shard, so they cannot be joined from a shard file and are fetched with one
+        extra `IN` query instead.
+    """
+    if is_sharded():
+        return selectinload(models.Post.owner)
+    return joinedload(models.Post.owner)
+
+
+def _sort_key(row):
+    return (row.created_at or datetime.min, row.id)
+
+
+def merge_pages(results, skip: int = 0, limit: int = None):
+    """
+    Merge per-shard result lists into one page.
+
+    Args:
+        results (list[list]): The rows returned by each shard, each list ordered by `(created_at, id)`.
+        skip (int): The number of merged rows to skip.
+        limit (int): The maximum number of rows to return (default: all of them).
+
+    Returns:
+        list: The merged rows, ordered by `(created_at, id)`.
+    """
+    merged = heapq.merge(*results, key=_sort_key)
+    return list(islice(merged, skip, None if limit is None else skip + limit))
+
+
+def paginate(query, skip: int, limit: int):
+    """
+    Fetch one page of a query over posts.
+
+    Args:
+        query (Query): A query over posts, or over post columns including `id` and `created_at`.
+        skip (int): The number of rows to skip.
+        limit (int): The maximum number of rows to return.
+
+    Returns:
+        list: The rows of the page, ordered by `(created_at, id)`.
+
+    The order is the same with and without sharding, and is total, so two queries
+    over the same rows (e.g. the ETag versions and the page itself) always agree.
+    Without sharding the ordered query is simply offset and limited. With sharding
+    each shard returns its first `skip + limit` rows, and the sorted per-shard lists
+    are combined with `merge_pages`.
+    """
+    ordered = query.order_by(models.Post.created_at, models.Post.id)
+    if not is_sharded():
+        return ordered.offset(skip).limit(limit).all()
+    ordered = ordered.limit(skip + limit)
+    return merge_pages([on_shard(ordered, shard_id).all() for shard_id in shard_engines], skip, limit)
+
+
+def gather(query):
+    """
+    Fetch all rows of a query over posts from every shard.
+
+    Returns:
+        list: The rows, ordered by `(created_at, id)`.
+    """
+    ordered = query.order_by(models.Post.created_at, models.Post.id)
+    if not is_sharded():
+        return ordered.all()
+    return merge_pages([on_shard(ordered, shard_id).all() for shard_id in shard_engines])
+
+
+def delete_user_content(db, user_id: int):
+    """
+    Delete a user's posts and comments from the shard files.
+
+    Args:
+        db (Session): The database session to use.
+        user_id (int): The ID of the user being deleted.
+
+    Foreign keys cannot cascade from `blog.db` into the shard files, so when sharding is
+    enabled the user's posts (with their comments) and the comments they wrote on other
+    posts are deleted explicitly. Without sharding this does nothing; the database
+    cascades the user's deletion itself.
+    """
+    if not is_sharded():
+        return
+    posts = db.query(models.Post).filter(models.Post.owner_id == user_id)
+    on_shard(posts, shard_for_owner(user_id)).delete(synchronize_session=False)
+    db.query(models.Comment).filter(models.Comment.author_id == user_id).delete(synchronize_session=False)
+
+
+def _shard_path(url_template: str, index: int):
+    return make_url(url_template.format(index=index)).database
+
+
+def _existing_shards(url_template: str):
+    """
+    Return the engines of all shard files, including ones left over from a larger `SHARD_COUNT`.
+    """
+    engines = dict(shard_engines)
+    index = len(shard_engines)
+    while os.path.exists(_shard_path(url_template, index)):
+        extra = create_engine(url_template.format(index=index), connect_args={"check_same_thread": False})
+        event.listen(extra, "connect", enable_sqlite_foreign_keys)
+        event.listen(extra, "connect", register_sqlite_functions)
+        engines[f"shard_{index}"] = extra
+        index += 1
+    return engines
+
+
+def _move(source, source_table, source_comments, ids, renumber: bool):
+    """
+    Move posts and their comments from a source database to their target shards.
+
+    Args:
+        source (Engine): The database the posts are read from.
+        source_table (Table): The posts table of the source.
+        source_comments (Table): The comments table of the source.
+        ids (list[int]): The IDs of the posts to move.
+        renumber (bool): Give the posts and comments new bucket-encoded IDs; used for
+            posts created before sharding was enabled.
+
+    The rows are written to the target shard first and deleted from the source after
+    the target commits. Moves between shards keep their IDs and use `INSERT OR REPLACE`,
+    so re-running an interrupted rebalance is safe.
+    """
+    with source.connect() as connection:
+        posts = connection.execute(select(source_table).where(source_table.c.id.in_(ids))).mappings().all()
+        comments = connection.execute(
+            select(source_comments).where(source_comments.c.post_id.in_(ids))
+        ).mappings().all()
+    comments_by_post = {}
+    for comment in comments:
+        comments_by_post.setdefault(comment["post_id"], []).append(dict(comment))
+    by_target = {}
+    for post in posts:
+        bucket = bucket_for_owner(post["owner_id"]) if renumber else post["id"] % BUCKET_COUNT
+        by_target.setdefault(shard_for_post(bucket), []).append((bucket, dict(post)))
+
+    for shard_id, entries in by_target.items():
+        with shard_engines[shard_id].begin() as connection:
+            moved_ids = []
+            for bucket, post in entries:
+                post_comments = comments_by_post.get(post["id"], [])
+                if renumber:
+                    post["id"] = allocate_id(connection, bucket)
+                    for comment in post_comments:
+                        comment["post_id"] = post["id"]
+                        comment["id"] = allocate_id(connection, bucket)
+                connection.execute(insert(shard_posts).prefix_with("OR REPLACE"), [post])
+                if post_comments:
+                    connection.execute(insert(shard_comments).prefix_with("OR REPLACE"), post_comments)
+                moved_ids.append(post["id"])
+                moved_ids.extend(comment["id"] for comment in post_comments)
+            if not renumber:
+                _advance_sequence(connection, moved_ids)
+    with source.begin() as connection:
+        connection.execute(delete(source_table).where(source_table.c.id.in_(ids)))
+    return len(posts)
+
+
+def rebalance(chunk_size: int = 500, global_engine=engine, url_template: str = SHARD_DATABASE_URL):
+    """
+    Move every post and comment to the shard it belongs on under the current settings.
+
+    Args:
+        chunk_size (int): The number of posts moved per transaction.
+        global_engine (Engine): The database holding posts created before sharding (default: `blog.db`).
+        url_template (str): The URL template of the shard files, used to find files left
+            over from a larger shard count (default: `SHARD_DATABASE_URL`).
+
+    Returns:
+        int: The number of posts moved.
+
+    This covers three cases:
+    - Enabling sharding: posts in `blog.db` are moved to the shard files and given new,
+      bucket-encoded IDs (old post IDs stop resolving).
+    - Changing `SHARD_COUNT`: posts whose bucket now maps to another shard are moved,
+      keeping their IDs. Shard files beyond the new count are drained and can be deleted.
+    - Nothing changed: no rows are moved.
+    """
+    if not is_sharded():
+        raise RuntimeError("Set SHARD_COUNT in app/database.py before rebalancing.")
+    create_shard_tables()
+    moved = 0
+
+    legacy_posts, legacy_comments = models.Post.__table__, models.Comment.__table__
+    while True:
+        with global_engine.connect() as connection:
+            ids = connection.execute(select(legacy_posts.c.id).order_by(legacy_posts.c.id).limit(chunk_size)).scalars().all()
+        if not ids:
+            break
+        moved += _move(global_engine, legacy_posts, legacy_comments, ids, renumber=True)
+
+    for shard_id, source in _existing_shards(url_template).items():
+        last_id = 0
+        while True:
+            with source.connect() as connection:
+                ids = connection.execute(
+                    select(shard_posts.c.id).where(shard_posts.c.id > last_id).order_by(shard_posts.c.id).limit(chunk_size)
+                ).scalars().all()
+            if not ids:
+                break
+            last_id = ids[-1]
+            misplaced = [post_id for post_id in ids if shard_for_post(post_id) != shard_id]
+            if misplaced:
+                moved += _move(source, shard_posts, shard_comments, misplaced, renumber=False)
+    return moved
+
+
+if __name__ == "__main__":
+    if sys.argv[1:] != ["rebalance"]:
+        sys.exit("Usage: python -m app.sharding rebalance")
+    count = rebalance()
+    print(f"Moved {count} posts across {len(shard_engines)} shards.")
@@ -0,0 +1,36 @@
+import math
+from app.compression import inflate
+
+
+def log2_add(score, weight):
+    """
+    Add a log2-scale weight to a log2-scale score.
+
+    Args:
+        score (float | None): The current score, or `None` if the post has no views yet.
+        weight (float): The log2 of the weight being added.
+
+    Returns:
+        float: `log2(2 ** score + 2 ** weight)`, computed without overflow.
+
+    `app.trending` folds the time-decayed weight of new views into `trending_score`
+    with this function, inside the `UPDATE` that flushes the view counts.
+    """
+    if score is None:
+        return weight
+    high, low = max(score, weight), min(score, weight)
+    return high + math.log2(1 + 2 ** (low - high))
+
+
+SQL_FUNCTIONS = {
+    "inflate": (1, inflate),
+    "log2_add": (2, log2_add),
+}
+"""
+The Python functions exposed to SQL, by name, with their number of arguments.
+- `inflate(value)` decodes compressed post bodies, so search can filter on their text
+  in SQL (see `app.compression`).
+- `log2_add(score, weight)` accumulates the time-decayed view scores of trending posts.
+- Registered on each connection of the application's engines by
+  `app.database.register_sqlite_functions`. All of them are deterministic.
+"""
@@ -0,0 +1,116 @@
+import hashlib
+import secrets
+from datetime import datetime, timedelta
+from app import models
+
+REFRESH_TOKEN_EXPIRE_DAYS = 30
+"""
+The lifetime of a refresh token, in days.
+- A client that refreshes at least this often never has to send its password again.
+- Each refresh replaces the token, so the lifetime counts from the last refresh.
+"""
+
+REFRESH_TOKEN_BYTES = 32
+"""
+The number of random bytes in a refresh token.
+- 256 bits cannot be guessed or brute-forced from a stolen hash, which is why a fast,
+  unsalted hash is enough to store them (unlike passwords, which need bcrypt).
+"""
+
+
+def hash_token(token: str):
+    """
+    Return the SHA-256 hex digest under which a refresh token is stored.
+    """
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+
+def issue_refresh_token(db, user_id: int, now: datetime = None):
+    """
+    Create a new refresh token for a user.
+
+    Args:
+        db (Session): The database session to use.
+        user_id (int): The ID of the user to issue the token to.
+        now (datetime): The issue time (default: the current UTC time).
+
+    Returns:
+        str: The refresh token. Only its hash is stored, so it cannot be shown again.
+
+    Expired tokens of the user are deleted at the same time, which keeps the table
+    bounded by the number of live sessions. The caller commits the session.
+    """
+    now = now or datetime.utcnow()
+    db.query(models.RefreshToken).filter(
+        models.RefreshToken.user_id == user_id, models.RefreshToken.expires_at <= now
+    ).delete(synchronize_session=False)
+    token = secrets.token_urlsafe(REFRESH_TOKEN_BYTES)
+    db.add(
+        models.RefreshToken(
+            user_id=user_id,
+            token_hash=hash_token(token),
+            created_at=now,
+            expires_at=now + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS),
+        )
+    )
+    return token
+
+
+def rotate_refresh_token(db, token: str):
+    """
+    Exchange a refresh token for a new one.
+
+    Args:
+        db (Session): The database session to use.
+        token (str): The refresh token presented by the client.
+
+    Returns:
+        tuple[models.User, str] | None: The token's user and the replacement token,
+        or `None` if the token is unknown, expired or already used.
+
+    The token is looked up through the unique index on its hash and marked as used
+    with a conditional `UPDATE`, so two concurrent refreshes with the same token
+    cannot both succeed. Presenting a token that was already used means it was copied
+    by someone else (or the client is replaying it), so every refresh token of the
+    user is revoked and the user has to log in again.
+    """
+    now = datetime.utcnow()
+    record = db.query(models.RefreshToken).filter(models.RefreshToken.token_hash == hash_token(token)).first()
+    if record is None or record.expires_at <= now:
+        return None
+    claimed = (
+        db.query(models.RefreshToken)
+        .filter(models.RefreshToken.id == record.id, models.RefreshToken.revoked_at.is_(None))
+        .update({models.RefreshToken.revoked_at: now}, synchronize_session=False)
+    )
+    if not claimed:
+        user_id = record.user_id
+        db.rollback()
+        revoke_refresh_tokens(db, user_id)
+        return None
+    replacement = issue_refresh_token(db, record.user_id, now)
+    db.commit()
+    return record.user, replacement
+
+
+def revoke_refresh_tokens(db, user_id: int):
+    """
+    Revoke every live refresh token of a user.
+
+    Args:
+        db (Session): The database session to use.
+        user_id (int): The ID of the user.
+
+    Returns:
+        int: The number of tokens revoked.
+
+    Access tokens already issued stay valid until they expire, which is at most
+    `ACCESS_TOKEN_EXPIRE_MINUTES` later.
+    """
+    count = (
+        db.query(models.RefreshToken)
+        .filter(models.RefreshToken.user_id == user_id, models.RefreshToken.revoked_at.is_(None))
+        .update({models.RefreshToken.revoked_at: datetime.utcnow()}, synchronize_session=False)
+    )
+    db.commit()
+    return count
@@ -0,0 +1,201 @@
+import logging
+import math
+import threading
+from collections import Counter
+from datetime import datetime
+from sqlalchemy import case, func
+from app import models, schemas, sharding
+from app.database import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+FLUSH_INTERVAL_SECONDS = 5
+"""
+How often buffered view counts are written to the database, in seconds.
+- Views recorded between two flushes cost one dictionary update each and no database write.
+"""
+
+TRENDING_REFRESH_SECONDS = 60
+"""
+How often the ranked trending list is rebuilt from the database, in seconds.
+"""
+
+TRENDING_HALF_LIFE_HOURS = 24
+"""
+The time after which a view counts half as much towards the trending score.
+"""
+
+TRENDING_SIZE = 50
+"""
+The number of posts kept in the precomputed trending list.
+"""
+
+TRENDING_EPOCH = datetime(2025, 1, 1)
+"""
+The reference time for trending scores.
+- Scores use forward decay: a view at time `t` adds a weight of `2 ** ((t - epoch) / half_life)`,
+  so newer views outweigh older ones without ever rewriting old scores.
+- Scores are stored as base-2 logarithms of the summed weights, which keeps them small
+  however far the current time is from the epoch.
+"""
+
+FLUSH_BATCH_SIZE = 300
+"""
+The maximum number of posts updated by one `UPDATE` statement, to stay within SQLite's
+limit on bound parameters.
+"""
+
+_pending_views = Counter()
+_pending_lock = threading.Lock()
+_trending = []
+_stop = threading.Event()
+_worker = None
+
+
+def record_view(post_id: int):
+    """
+    Count a view of a post in this worker's in-memory buffer.
+
+    Args:
+        post_id (int): The ID of the post that was viewed.
+
+    The count reaches the database on the next `flush_views`.
+    """
+    with _pending_lock:
+        _pending_views[post_id] += 1
+
+
+def flush_views(db):
+    """
+    Write buffered view counts to the database.
+
+    Args:
+        db (Session): The database session to use.
+
+    Returns:
+        int: The number of posts updated.
+
+    The buffer is swapped out under the lock, so request threads keep counting while
+    the flush runs. Each batch of posts is updated by a single `UPDATE ... CASE`
+    statement that increments `views` and folds the new views into `trending_score`.
+    If the write fails the counts are put back into the buffer for the next flush.
+    """
+    global _pending_views
+    with _pending_lock:
+        counts, _pending_views = _pending_views, Counter()
+    if not counts:
+        return 0
+    hours = (datetime.utcnow() - TRENDING_EPOCH).total_seconds() / 3600
+    base = hours / TRENDING_HALF_LIFE_HOURS
+    ids = list(counts)
+    try:
+        for start in range(0, len(ids), FLUSH_BATCH_SIZE):
+            batch = ids[start:start + FLUSH_BATCH_SIZE]
+            views = case({post_id: counts[post_id] for post_id in batch}, value=models.Post.id, else_=0)
+            weight = case({post_id: base + math.log2(counts[post_id]) for post_id in batch}, value=models.Post.id)
+            db.query(models.Post).filter(models.Post.id.in_(batch)).update(
+                {
+                    models.Post.views: models.Post.views + views,
+                    models.Post.trending_score: func.log2_add(models.Post.trending_score, weight),
+                    # Views are not part of the post's representation; keep HTTP validators stable.
+                    models.Post.updated_at: models.Post.updated_at,
+                },
+                synchronize_session=False,
+            )
+        db.commit()
+    except Exception:
+        db.rollback()
+        with _pending_lock:
+            _pending_views.update(counts)
+        raise
+    return len(ids)
+
+
+def refresh_trending(db):
+    """
+    Rebuild the precomputed list of trending posts.
+
+    Args:
+        db (Session): The database session to use.
+
+    Returns:
+        list[schemas.TrendingPostOut]: The new trending list, highest score first.
+
+    The top posts are read through the index on `trending_score`, so this never sorts
+    the whole table. With sharding each shard returns its own top posts and the
+    candidates are ranked together. The result is kept in memory and served as-is
+    by `trending_posts`.
+    """
+    global _trending
+    candidates = (
+        db.query(models.Post)
+        .options(sharding.owner_loader())
+        .filter(models.Post.trending_score.isnot(None), models.Post.deleted_at.is_(None))
+        .order_by(models.Post.trending_score.desc())
+        .limit(TRENDING_SIZE)
+        .all()
+    )
+    posts = sorted(candidates, key=lambda post: post.trending_score, reverse=True)[:TRENDING_SIZE]
+    _trending = [schemas.TrendingPostOut.model_validate(post) for post in posts]
+    return _trending
+
+
+def trending_posts(limit: int = TRENDING_SIZE):
+    """
+    Return the most recently computed trending posts.
+
+    Args:
+        limit (int): The maximum number of posts to return.
+
+    Returns:
+        list[schemas.TrendingPostOut]: The trending posts, highest score first.
+    """
+    return _trending[:limit]
+
+
+def _run():
+    """
+    Flush views and refresh the trending list until `stop` is called.
+    """
+    since_refresh = TRENDING_REFRESH_SECONDS
+    while True:
+        db = SessionLocal()
+        try:
+            flush_views(db)
+            if since_refresh >= TRENDING_REFRESH_SECONDS:
+                refresh_trending(db)
+                since_refresh = 0
+        except Exception:
+            # The counts are kept in the buffer; try again on the next tick.
+            logger.exception("Flushing views or refreshing trending posts failed")
+        finally:
+            db.close()
+        if _stop.wait(FLUSH_INTERVAL_SECONDS):
+            break
+        since_refresh += FLUSH_INTERVAL_SECONDS
+
+
+def start():
+    """
+    Start the background thread that flushes views and refreshes the trending list.
+    """
+    global _worker
+    if _worker is not None and _worker.is_alive():
+        return
+    _stop.clear()
+    _worker = threading.Thread(target=_run, name="view-flusher", daemon=True)
+    _worker.start()
+
+
+def stop():
+    """
+    Stop the background thread and flush any views still in the buffer.
+    """
+    _stop.set()
+    if _worker is not None:
+        _worker.join()
+    db = SessionLocal()
+    try:
+        flush_views(db)
+    finally:
+        db.close()
@@ -0,0 +1,106 @@
+"""
+Benchmark the CPU cost of keeping a user authenticated, with and without refresh tokens.
+
+Usage:
+    python -m benchmarks.bench_auth [--users N] [--expire-minutes M] [--rounds R]
+
+A fresh SQLite database is filled with users and live refresh tokens, then the CPU
+time (`time.process_time`) of the two ways of renewing an expired access token is
+measured:
+- password login: look up the user, verify the password with bcrypt, sign a JWT;
+- refresh: look up the refresh token by its SHA-256 hash, rotate it, sign a JWT.
+
+An active user renews their access token every `--expire-minutes`, so the report
+multiplies each cost by `60 / expire_minutes` to give the CPU spent per active user
+per hour, and the number of active users one core can sustain.
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+import jwt
+from passlib.context import CryptContext
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from app import models, tokens
+
+SECRET_KEY = "benchmark-secret-key-of-32-bytes!"
+"""
+The JWT signing key used by the benchmark; real deployments read theirs from `app.config`.
+"""
+
+
+def cpu_ms(function, repeat: int):
+    """
+    Run `function` `repeat` times and return the mean CPU time per call in milliseconds.
+    """
+    start = time.process_time()
+    for _ in range(repeat):
+        function()
+    return (time.process_time() - start) * 1000 / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--users", type=int, default=10000, help="number of users with a live refresh token")
+    parser.add_argument("--expire-minutes", type=int, default=15, help="access token lifetime (ACCESS_TOKEN_EXPIRE_MINUTES)")
+    parser.add_argument("--rounds", type=int, default=12, help="bcrypt cost factor, as used by passlib by default")
+    parser.add_argument("--repeat", type=int, default=200, help="number of timed operations per method")
+    args = parser.parse_args()
+
+    pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=args.rounds)
+    password_hash = pwd_context.hash("correct horse battery staple")
+    directory = tempfile.mkdtemp()
+    path = os.path.join(directory, "bench.db")
+    engine = create_engine(f"sqlite:///{path}")
+    models.Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine)
+
+    db = Session()
+    db.add_all(
+        models.User(username=f"user{index}", email=f"user{index}@example.com", password=password_hash)
+        for index in range(args.users)
+    )
+    db.commit()
+    live = {index + 1: tokens.issue_refresh_token(db, index + 1) for index in range(args.users)}
+    db.commit()
+    db.close()
+    rng = random.Random(42)
+
+    def sign(username):
+        return jwt.encode({"sub": username, "exp": int(time.time()) + args.expire_minutes * 60}, SECRET_KEY)
+
+    def login():
+        session = Session()
+        user = session.query(models.User).filter(models.User.username == f"user{rng.randrange(args.users)}").first()
+        assert pwd_context.verify("correct horse battery staple", user.password)
+        sign(user.username)
+        session.close()
+
+    def refresh():
+        session = Session()
+        user_id = rng.randint(1, args.users)
+        user, live[user_id] = tokens.rotate_refresh_token(session, live[user_id])
+        sign(user.username)
+        session.close()
+
+    renewals = 60 / args.expire_minutes
+    results = [
+        ("password login", cpu_ms(login, max(1, args.repeat // 10))),
+        ("refresh token", cpu_ms(refresh, args.repeat)),
+    ]
+    engine.dispose()
+    os.remove(path)
+    os.rmdir(directory)
+
+    print(f"{args.users} users, access tokens valid {args.expire_minutes} min ({renewals:g} renewals per user-hour), bcrypt rounds {args.rounds}")
+    print(f"{'method':<16}{'CPU ms/op':>11}{'CPU ms/user-hour':>18}{'users/core':>12}")
+    for name, per_op in results:
+        per_user_hour = per_op * renewals
+        print(f"{name:<16}{per_op:>11.3f}{per_user_hour:>18.2f}{3600 * 1000 / per_user_hour:>12.0f}")
+    print(f"refresh tokens use {results[0][1] / results[1][1]:.0f}x less CPU per renewal")
+
+
+if __name__ == "__main__":
+    main()
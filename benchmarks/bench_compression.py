@@ -0,0 +1,140 @@
+"""
+Benchmark compressed post storage against plain text storage.
+
+Usage:
+    python -m benchmarks.bench_compression [--posts N] [--size BYTES]
+
+For each storage mode a fresh SQLite database is filled with long-form posts, then:
+- the database file size is measured,
+- the share of the database that fits in a fixed SQLite page cache is reported
+  (a proxy for the cache hit rate of a warm server, since Python's `sqlite3`
+  does not expose SQLite's own cache counters),
+- read latency is timed for the list endpoint query with and without bodies
+  and for single-post reads.
+"""
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import joinedload, sessionmaker, undefer
+from app import compression, models
+
+CACHE_PAGES = 2000
+"""
+The SQLite page cache size used for the benchmark, in pages.
+"""
+
+WORDS = (
+    "the quick brown fox jumps over a lazy dog while fastapi serves blog posts "
+    "from sqlite and readers scroll through long form articles about python"
+).split()
+
+
+def make_body(size: int, rng: random.Random):
+    """
+    Generate a pseudo-random English-like post body of roughly `size` characters.
+    """
+    words = []
+    length = 0
+    while length < size:
+        word = rng.choice(WORDS)
+        words.append(word)
+        length += len(word) + 1
+    return " ".join(words)
+
+
+def timed(function, repeat: int):
+    """
+    Run `function` `repeat` times and return the median duration in milliseconds.
+    """
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def run(compressed: bool, posts: int, size: int):
+    """
+    Fill a fresh database in the given storage mode and measure it.
+
+    Returns:
+        dict: The measurements for this mode.
+    """
+    compression.COMPRESS_POST_CONTENT = compressed
+    rng = random.Random(42)
+    directory = tempfile.mkdtemp()
+    path = os.path.join(directory, "bench.db")
+    engine = create_engine(f"sqlite:///{path}")
+    event.listen(engine, "connect", lambda connection, record: connection.execute(f"PRAGMA cache_size={CACHE_PAGES}"))
+    models.Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine)
+
+    db = Session()
+    user = models.User(username="bench", email="bench@example.com", password="x")
+    db.add(user)
+    db.commit()
+    for index in range(posts):
+        db.add(models.Post(title=f"Post {index}", content=make_body(size, rng), owner_id=user.id))
+    db.commit()
+    db.close()
+    with engine.connect() as connection:
+        connection.exec_driver_sql("VACUUM")
+        page_size = connection.exec_driver_sql("PRAGMA page_size").scalar()
+        page_count = connection.exec_driver_sql("PRAGMA page_count").scalar()
+
+    def list_posts(include_content: bool):
+        session = Session()
+        query = session.query(models.Post).options(joinedload(models.Post.owner)).limit(100)
+        if include_content:
+            query = query.options(undefer(models.Post.content))
+        rows = query.all()
+        if include_content:
+            [row.content for row in rows]
+        session.close()
+
+    def read_single():
+        session = Session()
+        post_id = rng.randint(1, posts)
+        post = session.query(models.Post).options(undefer(models.Post.content)).filter(models.Post.id == post_id).first()
+        post.content
+        session.close()
+
+    result = {
+        "mode": "compressed" if compressed else "plain",
+        "size_mb": os.path.getsize(path) / 1024 / 1024,
+        "cache_coverage": min(1.0, CACHE_PAGES / page_count),
+        "pages": page_count,
+        "page_size": page_size,
+        "list_summary_ms": timed(lambda: list_posts(False), 50),
+        "list_full_ms": timed(lambda: list_posts(True), 50),
+        "read_ms": timed(read_single, 500),
+    }
+    engine.dispose()
+    os.remove(path)
+    os.rmdir(directory)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--posts", type=int, default=5000, help="number of posts to create")
+    parser.add_argument("--size", type=int, default=8000, help="approximate body size in characters")
+    args = parser.parse_args()
+
+    print(f"{args.posts} posts of ~{args.size} characters, page cache of {CACHE_PAGES} pages")
+    print(f"{'mode':<12}{'size MB':>10}{'pages':>10}{'cache cover':>13}{'list (no body) ms':>19}{'list (body) ms':>16}{'read ms':>10}")
+    for compressed in (False, True):
+        r = run(compressed, args.posts, args.size)
+        print(
+            f"{r['mode']:<12}{r['size_mb']:>10.2f}{r['pages']:>10}{r['cache_coverage']:>12.0%} "
+            f"{r['list_summary_ms']:>18.2f}{r['list_full_ms']:>16.2f}{r['read_ms']:>10.3f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,32 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
 from sqlalchemy.orm import Session
-from app import models, schemas
+from app import caching, models, schemas, sharding
 from app.dependencies import get_db
 
 # Create a router for comment-related endpoints
 router = APIRouter()
 
+def _require_visible_post(db: Session, post_id: int, allow_missing: bool = False):
+    """
+    Make sure comments of a post may be served or added.
+
+    Args:
+        db (Session): The database session to use.
+        post_id (int): The ID of the post.
+        allow_missing (bool): Let an unknown post ID through, so that the comment
+            listing keeps returning an empty list for it.
+
+    Raises:
+        HTTPException: If the post is soft-deleted, or does not exist and
+            `allow_missing` is False.
+
+    Soft-deleted posts are hidden from every post endpoint, so their comments are
+    hidden too. The check reads only `deleted_at`, by primary key.
+    """
+    row = sharding.for_post(db.query(models.Post.deleted_at).filter(models.Post.id == post_id), post_id).first()
+    if (row is None and not allow_missing) or (row is not None and row.deleted_at is not None):
+        raise HTTPException(status_code=404, detail="Post not found")
+
 @router.post("/", response_model=schemas.CommentOut)
 def create_comment(post_id: int, comment: schemas.CommentCreate, db: Session = Depends(get_db)):
     """
@@ -19,10 +40,14 @@ def create_comment(post_id: int, comment: schemas.CommentCreate, db: Session = D
     Returns:
         schemas.CommentOut: The created comment with its details.
 
+    Raises:
+        HTTPException: If the post does not exist or has been soft-deleted.
+
     This function creates a new `Comment` object, associates it with the specified post,
     saves it to the database, and returns the created comment. The `post_id` is used to
     link the comment to the corresponding blog post.
     """
+    _require_visible_post(db, post_id)
     db_comment = models.Comment(content=comment.content, post_id=post_id)
     db.add(db_comment)
     db.commit()
@@ -30,19 +55,42 @@ def create_comment(post_id: int, comment: schemas.CommentCreate, db: Session = D
     return db_comment
 
 @router.get("/{post_id}", response_model=list[schemas.CommentOut])
-def get_comments(post_id: int, db: Session = Depends(get_db)):
+def get_comments(post_id: int, request: Request, response: Response, db: Session = Depends(get_db)):
     """
     Retrieve all comments for a specific blog post.
 
     Args:
         post_id (int): The ID of the post for which to retrieve comments.
+        request (Request): The incoming request, used for its conditional headers.
+        response (Response): The outgoing response, used to set caching headers.
         db (Session): The database session dependency.
 
     Returns:
-        list[schemas.CommentOut]: A list of comments associated with the specified post.
+        list[schemas.CommentOut]: A list of comments associated with the specified post,
+        or an empty `304 Not Modified` response if the client's copy is current.
+
+    Raises:
+        HTTPException: If the post has been soft-deleted.
 
     This function queries the database for all comments linked to the given `post_id`
     and returns them as a list. If no comments are found, an empty list is returned.
+
+    Comments cannot be edited, so the ETag is derived from the IDs of the post's
+    comments, read through the `post_id` index before the comments are loaded.
     """
-    comments = db.query(models.Comment).filter(models.Comment.post_id == post_id).all()
+    _require_visible_post(db, post_id, allow_missing=True)
+    versions = sharding.for_post(
+        db.query(models.Comment.id, models.Comment.created_at)
+        .filter(models.Comment.post_id == post_id)
+        .order_by(models.Comment.id),
+        post_id,
+    ).all()
+    etag = caching.make_etag("comments", post_id, [version.id for version in versions])
+    last_modified = max((version.created_at for version in versions if version.created_at), default=None)
+    if caching.is_not_modified(request, etag):
+        return caching.not_modified("comments", etag, last_modified)
+    comments = sharding.for_post(
+        db.query(models.Comment).filter(models.Comment.post_id == post_id).order_by(models.Comment.id), post_id
+    ).all()
+    caching.set_headers(response, "comments", etag, last_modified)
     return comments
\ No newline at end of file
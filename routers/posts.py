@@ -1,6 +1,8 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session, joinedload
-from app import models, schemas
+from datetime import datetime, timedelta
+from typing import Optional, Union
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Request, Response
+from sqlalchemy.orm import Session, undefer
+from app import bulk, caching, compression, models, schemas, sharding, trending
 from app.dependencies import get_db
 
 router = APIRouter(
@@ -30,46 +32,151 @@ def create_post(user_id: int, post: schemas.PostCreate, db: Session = Depends(ge
     db.refresh(db_post)
     return db_post
 
-@router.get("/", response_model=list[schemas.PostOut])
-def read_posts(skip: int = 0, limit: int = 10, db: Session = Depends(get_db)):
+def _with_content(query, include_content: bool):
+    """
+    Load post bodies eagerly if the response needs them.
+
+    Args:
+        query (Query): A query over `models.Post`.
+        include_content (bool): Whether the response will include post bodies.
+
+    Returns:
+        Query: The query, with the deferred `content` column undeferred if needed so
+        that bodies are fetched in the same statement rather than one query per post.
+    """
+    if include_content:
+        return query.options(undefer(models.Post.content))
+    return query
+
+def _as_response(posts, include_content: bool):
+    """
+    Shape a list of posts for the list and search endpoints.
+
+    Args:
+        posts (list[models.Post]): The posts to return.
+        include_content (bool): Whether the response should include post bodies.
+
+    Returns:
+        list: The posts themselves, or `schemas.PostSummary` objects built without
+        touching the deferred `content` attribute.
+    """
+    if include_content:
+        return posts
+    return [schemas.PostSummary.model_validate(post) for post in posts]
+
+@router.get("/", response_model=list[Union[schemas.PostOut, schemas.PostSummary]])
+def read_posts(
+    request: Request,
+    response: Response,
+    skip: int = 0,
+    limit: int = 10,
+    include_content: bool = True,
+    db: Session = Depends(get_db),
+):
     """
     Retrieve a list of blog posts with pagination.
 
     Args:
+        request (Request): The incoming request, used for its conditional headers.
+        response (Response): The outgoing response, used to set caching headers.
         skip (int): The number of posts to skip (default: 0).
         limit (int): The maximum number of posts to return (default: 10).
+        include_content (bool): Whether to return post bodies (default: True).
         db (Session): The database session dependency.
 
     Returns:
-        list[schemas.PostOut]: A list of posts with their details.
+        list[schemas.PostOut | schemas.PostSummary]: A list of posts with their details,
+        or an empty `304 Not Modified` response if the client's copy is current.
 
     This function queries the database for posts, including their owners,
-    and returns a paginated list of posts.
+    and returns a paginated list of posts. Soft-deleted posts are excluded.
+    With `include_content=false` the bodies are never read from the database.
+
+    The ETag is computed from the IDs and modification times of the page, which
+    are read first without the post bodies; a matching `If-None-Match` is answered
+    with 304 before the posts themselves are loaded. `If-Modified-Since` is not
+    honoured for listings, since removing a post does not advance `Last-Modified`.
+
+    Posts are ordered by `(created_at, id)`, oldest first, with or without sharding.
+    When sharding is enabled, each shard is queried and the pages are merged (see
+    `sharding.paginate`).
+    """
+    page = db.query(models.Post).filter(models.Post.deleted_at.is_(None))
+    versions = sharding.paginate(
+        page.with_entities(models.Post.id, models.Post.created_at, models.Post.updated_at), skip, limit
+    )
+    etag = caching.make_etag("posts", skip, limit, include_content, [tuple(version) for version in versions])
+    last_modified = max(
+        (version.updated_at or version.created_at for version in versions if version.updated_at or version.created_at),
+        default=None,
+    )
+    if caching.is_not_modified(request, etag):
+        return caching.not_modified("posts", etag, last_modified)
+    posts = sharding.paginate(_with_content(page.options(sharding.owner_loader()), include_content), skip, limit)
+    caching.set_headers(response, "posts", etag, last_modified)
+    return _as_response(posts, include_content)
+
+@router.get("/trending", response_model=list[schemas.TrendingPostOut])
+def read_trending_posts(limit: int = 10):
+    """
+    Retrieve the currently trending blog posts.
+
+    Args:
+        limit (int): The maximum number of posts to return (default: 10).
+
+    Returns:
+        list[schemas.TrendingPostOut]: The posts with the highest time-decayed view scores.
+
+    This function serves the ranked list precomputed by `app.trending`, which is
+    refreshed periodically in the background; it does not query the database.
     """
-    posts = db.query(models.Post).options(joinedload(models.Post.owner)).offset(skip).limit(limit).all()
-    return posts
+    return trending.trending_posts(limit)
 
 @router.get("/{post_id}", response_model=schemas.PostOut)
-def read_post(post_id: int, db: Session = Depends(get_db)):
+def read_post(post_id: int, request: Request, response: Response, db: Session = Depends(get_db)):
     """
     Retrieve a single blog post by its ID.
 
     Args:
         post_id (int): The ID of the post to retrieve.
+        request (Request): The incoming request, used for its conditional headers.
+        response (Response): The outgoing response, used to set caching headers.
         db (Session): The database session dependency.
 
     Returns:
-        schemas.PostOut: The details of the requested post.
+        schemas.PostOut: The details of the requested post, or an empty
+        `304 Not Modified` response if the client's copy is current.
 
     Raises:
         HTTPException: If the post with the given ID is not found.
 
     This function queries the database for a post by its ID, including its owner,
-    and returns the post details if found.
+    and returns the post details if found. Soft-deleted posts are reported as not found.
+    The view is counted in memory and written to the database in the next batch.
+
+    The post's modification time is read first on its own; if it satisfies
+    `If-None-Match` or `If-Modified-Since`, a 304 is returned without loading the
+    body or the owner.
     """
-    post = db.query(models.Post).options(joinedload(models.Post.owner)).filter(models.Post.id == post_id).first()
-    if not post:
+    version = sharding.for_post(
+        db.query(models.Post.created_at, models.Post.updated_at)
+        .filter(models.Post.id == post_id, models.Post.deleted_at.is_(None)),
+        post_id,
+    ).first()
+    if not version:
         raise HTTPException(status_code=404, detail="Post not found")
+    trending.record_view(post_id)
+    last_modified = version.updated_at or version.created_at
+    etag = caching.make_etag("post", post_id, last_modified)
+    if caching.is_not_modified(request, etag, last_modified):
+        return caching.not_modified("post", etag, last_modified)
+    post = sharding.for_post(
+        db.query(models.Post)
+        .options(sharding.owner_loader(), undefer(models.Post.content))
+        .filter(models.Post.id == post_id),
+        post_id,
+    ).first()
+    caching.set_headers(response, "post", etag, last_modified)
     return post
 
 @router.put("/{post_id}", response_model=schemas.PostOut)
@@ -91,7 +198,9 @@ def update_post(post_id: int, post: schemas.PostCreate, db: Session = Depends(ge
     This function retrieves a post by its ID, updates its fields with the new data,
     saves the changes to the database, and returns the updated post.
     """
-    db_post = db.query(models.Post).filter(models.Post.id == post_id).first()
+    db_post = sharding.for_post(
+        db.query(models.Post).filter(models.Post.id == post_id, models.Post.deleted_at.is_(None)), post_id
+    ).first()
     if not db_post:
         raise HTTPException(status_code=404, detail="Post not found")
     for key, value in post.dict().items():
@@ -101,12 +210,13 @@ def update_post(post_id: int, post: schemas.PostCreate, db: Session = Depends(ge
     return db_post
 
 @router.delete("/{post_id}", response_model=schemas.PostOut)
-def delete_post(post_id: int, db: Session = Depends(get_db)):
+def delete_post(post_id: int, soft: bool = False, db: Session = Depends(get_db)):
     """
     Delete a blog post by its ID.
 
     Args:
         post_id (int): The ID of the post to delete.
+        soft (bool): If True, tombstone the post instead of removing it (default: False).
         db (Session): The database session dependency.
 
     Returns:
@@ -116,29 +226,131 @@ def delete_post(post_id: int, db: Session = Depends(get_db)):
         HTTPException: If the post with the given ID is not found.
 
     This function retrieves a post by its ID, deletes it from the database,
-    and returns the details of the deleted post.
+    and returns the details of the deleted post. Its comments are removed by the
+    database through `ON DELETE CASCADE`. A soft delete only sets `deleted_at`;
+    the row is removed later by the purge endpoint.
+
+    The owner and the deferred body are loaded before the delete, because a deleted
+    post is detached from the session once the transaction commits.
     """
-    db_post = db.query(models.Post).filter(models.Post.id == post_id).first()
+    db_post = sharding.for_post(
+        db.query(models.Post)
+        .options(sharding.owner_loader(), undefer(models.Post.content))
+        .filter(models.Post.id == post_id, models.Post.deleted_at.is_(None)),
+        post_id,
+    ).first()
     if not db_post:
         raise HTTPException(status_code=404, detail="Post not found")
-    db.delete(db_post)
+    if soft:
+        db_post.deleted_at = datetime.utcnow()
+    else:
+        db.delete(db_post)
     db.commit()
     return db_post
 
-@router.get("/search/", response_model=list[schemas.PostOut])
-def search_posts(query: str, db: Session = Depends(get_db)):
+@router.get("/search/", response_model=list[Union[schemas.PostOut, schemas.PostSummary]])
+def search_posts(query: str, include_content: bool = True, db: Session = Depends(get_db)):
     """
     Search for blog posts by title or content.
 
     Args:
         query (str): The search query string.
+        include_content (bool): Whether to return post bodies (default: True).
         db (Session): The database session dependency.
 
     Returns:
-        list[schemas.PostOut]: A list of posts matching the search query.
+        list[schemas.PostOut | schemas.PostSummary]: A list of posts matching the search query.
 
     This function queries the database for posts where the title or content
-    contains the search query and returns the matching posts.
+    contains the search query and returns the matching posts. Soft-deleted posts are excluded.
+    Compressed bodies are matched through the `inflate()` SQL function, row by row.
+    """
+    content = compression.searchable(models.Post.content)
+    search = (
+        db.query(models.Post)
+        .options(sharding.owner_loader())
+        .filter(models.Post.title.contains(query) | content.contains(query))
+        .filter(models.Post.deleted_at.is_(None))
+    )
+    posts = sharding.gather(_with_content(search, include_content))
+    return _as_response(posts, include_content)
+
+@router.delete("/bulk/", response_model=schemas.BulkJobOut, status_code=202)
+def bulk_delete_posts(
+    background_tasks: BackgroundTasks,
+    user_id: Optional[int] = None,
+    created_after: Optional[datetime] = None,
+    created_before: Optional[datetime] = None,
+    soft: bool = False,
+    chunk_size: int = bulk.CHUNK_SIZE,
+):
+    """
+    Delete all posts of a user and/or within a date range in the background.
+
+    Args:
+        background_tasks (BackgroundTasks): Used to run the deletion after the response is sent.
+        user_id (Optional[int]): Only delete posts owned by this user.
+        created_after (Optional[datetime]): Only delete posts created at or after this time.
+        created_before (Optional[datetime]): Only delete posts created before this time.
+        soft (bool): If True, tombstone the posts instead of removing them (default: False).
+        chunk_size (int): The maximum number of posts deleted per transaction.
+
+    Returns:
+        schemas.BulkJobOut: The submitted job; poll `GET /posts/bulk/{job_id}` for progress.
+
+    Raises:
+        HTTPException: If no filter is given or `chunk_size` is not positive.
+
+    The deletion runs in chunks of `chunk_size` posts, each committed separately, so
+    the SQLite write lock is never held for the whole operation.
+    """
+    conditions = bulk.post_filters(user_id, created_after, created_before)
+    if not conditions:
+        raise HTTPException(status_code=400, detail="At least one of user_id, created_after or created_before is required")
+    if chunk_size < 1:
+        raise HTTPException(status_code=400, detail="chunk_size must be positive")
+    job = bulk.create_job("soft_delete" if soft else "delete")
+    background_tasks.add_task(bulk.delete_posts, job, conditions, soft, chunk_size)
+    return job
+
+@router.post("/purge/", response_model=schemas.BulkJobOut, status_code=202)
+def purge_posts(background_tasks: BackgroundTasks, older_than_minutes: int = 0, chunk_size: int = bulk.CHUNK_SIZE):
+    """
+    Permanently remove soft-deleted posts in the background.
+
+    Args:
+        background_tasks (BackgroundTasks): Used to run the purge after the response is sent.
+        older_than_minutes (int): Only purge posts tombstoned at least this many minutes ago (default: 0).
+        chunk_size (int): The maximum number of posts removed per transaction.
+
+    Returns:
+        schemas.BulkJobOut: The submitted job; poll `GET /posts/bulk/{job_id}` for progress.
+
+    Raises:
+        HTTPException: If `chunk_size` is not positive.
+    """
+    if chunk_size < 1:
+        raise HTTPException(status_code=400, detail="chunk_size must be positive")
+    job = bulk.create_job("purge")
+    background_tasks.add_task(bulk.purge_deleted_posts, job, timedelta(minutes=older_than_minutes), chunk_size)
+    return job
+
+@router.get("/bulk/{job_id}", response_model=schemas.BulkJobOut)
+def read_bulk_job(job_id: str):
+    """
+    Retrieve the progress of a bulk delete or purge job.
+
+    Args:
+        job_id (str): The ID returned when the job was submitted.
+
+    Returns:
+        schemas.BulkJobOut: The job's status and progress counters.
+
+    Raises:
+        HTTPException: If no job with the given ID is known to this worker, or it
+            finished more than `bulk.JOB_TTL` ago.
     """
-    posts = db.query(models.Post).filter(models.Post.title.contains(query) | models.Post.content.contains(query)).all()
-    return posts
\ No newline at end of file
+    job = bulk.jobs.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
\ No newline at end of file
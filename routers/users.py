@@ -1,6 +1,6 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException
 from sqlalchemy.orm import Session
-from app import models, schemas
+from app import bulk, models, schemas, tokens
 from app.dependencies import get_db
 from app.config import SECRET_KEY, ALGORITHM, ACCESS_TOKEN_EXPIRE_MINUTES
 from passlib.context import CryptContext
@@ -18,23 +18,75 @@ pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
 
-def create_access_token(data: dict):
+def create_access_token(data: dict, expires_delta: timedelta = None):
     """
-    Generate a JSON Web Token (JWT) for user authentication without expiration.
+    Generate a short-lived JSON Web Token (JWT) for user authentication.
 
     Args:
         data (dict): The data to encode in the token (e.g., user information).
+        expires_delta (timedelta): The lifetime of the token (default: `ACCESS_TOKEN_EXPIRE_MINUTES`).
 
     Returns:
         str: The encoded JWT token.
 
-    This function creates a JWT token by encoding the provided data without an expiration time.
+    This function creates a JWT token by encoding the provided data with an `exp` claim.
     The token is signed using the SECRET_KEY and ALGORITHM defined in the configuration.
+    Clients obtain a new one from `/token/refresh` instead of logging in again.
     """
     to_encode = data.copy()
+    to_encode["exp"] = datetime.utcnow() + (expires_delta or timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES))
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
 
+def issue_tokens(user: models.User, refresh_token: str):
+    """
+    Build the token response for a user.
+
+    Args:
+        user (models.User): The authenticated user.
+        refresh_token (str): The refresh token issued alongside the access token.
+
+    Returns:
+        dict: The access token, refresh token, token type and access token lifetime.
+    """
+    return {
+        "access_token": create_access_token(data={"sub": user.username}),
+        "refresh_token": refresh_token,
+        "token_type": "bearer",
+        "expires_in": ACCESS_TOKEN_EXPIRE_MINUTES * 60,
+    }
+
+
+def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+    """
+    Resolve the user from a bearer access token.
+
+    Args:
+        token (str): The access token from the `Authorization` header.
+        db (Session): The database session dependency.
+
+    Returns:
+        models.User: The user the token was issued to.
+
+    Raises:
+        HTTPException: If the token is invalid, expired or belongs to no user.
+
+    Checking an access token costs a signature check and one indexed lookup by
+    username; no password hash is verified.
+    """
+    credentials_error = HTTPException(
+        status_code=401, detail="Could not validate credentials", headers={"WWW-Authenticate": "Bearer"}
+    )
+    try:
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    except jwt.InvalidTokenError:
+        raise credentials_error
+    user = db.query(models.User).filter(models.User.username == payload.get("sub")).first()
+    if user is None:
+        raise credentials_error
+    return user
+
+
 @router.post("/register", response_model=schemas.UserOut)
 def register(user: schemas.UserCreate, db: Session = Depends(get_db)):
     """
@@ -58,23 +110,113 @@ def register(user: schemas.UserCreate, db: Session = Depends(get_db)):
     return db_user
 
 
-@router.post("/token")
+@router.post("/token", response_model=schemas.Token)
 def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
     """
-    Authenticate a user and generate an access token.
+    Authenticate a user and generate an access token and a refresh token.
 
     Args:
         form_data (OAuth2PasswordRequestForm): The login form data (username and password).
         db (Session): The database session dependency.
 
     Returns:
-        dict: A dictionary containing the access token and token type.
+        schemas.Token: The access token, refresh token, token type and access token lifetime.
 
     Raises:
         HTTPException: If the username or password is incorrect.
+
+    This is the only endpoint that verifies a password with bcrypt. Once the access
+    token expires, clients call `/token/refresh` with the refresh token instead.
     """
     user = db.query(models.User).filter(models.User.username == form_data.username).first()
     if not user or not pwd_context.verify(form_data.password, user.password):
         raise HTTPException(status_code=400, detail="Incorrect username or password")
-    access_token = create_access_token(data={"sub": user.username})
-    return {"access_token": access_token, "token_type": "bearer"}
\ No newline at end of file
+    refresh_token = tokens.issue_refresh_token(db, user.id)
+    db.commit()
+    return issue_tokens(user, refresh_token)
+
+@router.post("/token/refresh", response_model=schemas.Token)
+def refresh(body: schemas.TokenRefresh, db: Session = Depends(get_db)):
+    """
+    Exchange a refresh token for a new access token and a new refresh token.
+
+    Args:
+        body (schemas.TokenRefresh): The refresh token returned by the last login or refresh.
+        db (Session): The database session dependency.
+
+    Returns:
+        schemas.Token: The new access token and refresh token.
+
+    Raises:
+        HTTPException: If the refresh token is unknown, expired, revoked or already used.
+
+    Refresh tokens are single-use: the presented token is invalidated and replaced.
+    Reusing an old token revokes all of the user's refresh tokens (see
+    `tokens.rotate_refresh_token`).
+    """
+    rotated = tokens.rotate_refresh_token(db, body.refresh_token)
+    if rotated is None:
+        raise HTTPException(status_code=401, detail="Invalid refresh token")
+    user, refresh_token = rotated
+    return issue_tokens(user, refresh_token)
+
+@router.delete("/{user_id}/tokens")
+def revoke_tokens(user_id: int, current_user: models.User = Depends(get_current_user), db: Session = Depends(get_db)):
+    """
+    Revoke all refresh tokens of a user, e.g. to log out of every device.
+
+    Args:
+        user_id (int): The ID of the user whose tokens are revoked.
+        current_user (models.User): The authenticated user; must be the same user.
+        db (Session): The database session dependency.
+
+    Returns:
+        dict: The number of refresh tokens revoked.
+
+    Raises:
+        HTTPException: If the caller is not the user.
+
+    Access tokens already issued stay valid until they expire.
+    """
+    if current_user.id != user_id:
+        raise HTTPException(status_code=403, detail="Not allowed to revoke another user's tokens")
+    return {"revoked": tokens.revoke_refresh_tokens(db, user_id)}
+
+@router.delete("/{user_id}", response_model=schemas.BulkJobOut, status_code=202)
+def delete_user(
+    user_id: int,
+    background_tasks: BackgroundTasks,
+    chunk_size: int = bulk.CHUNK_SIZE,
+    current_user: models.User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    """
+    Delete a user together with all of their posts and comments in the background.
+
+    Args:
+        user_id (int): The ID of the user to delete.
+        background_tasks (BackgroundTasks): Used to run the deletion after the response is sent.
+        chunk_size (int): The maximum number of posts deleted per transaction.
+        current_user (models.User): The authenticated user; must be the same user.
+        db (Session): The database session dependency.
+
+    Returns:
+        schemas.BulkJobOut: The submitted job; poll `GET /posts/bulk/{job_id}` for progress.
+
+    Raises:
+        HTTPException: If the caller is not the user, the user with the given ID is not
+            found or `chunk_size` is not positive.
+
+    The user's posts are deleted in chunks of `chunk_size` (see `bulk.delete_user`), and
+    the user row is deleted once all of them are gone, so the job's `total` and
+    `processed` count posts.
+    """
+    if current_user.id != user_id:
+        raise HTTPException(status_code=403, detail="Not allowed to delete another user")
+    if chunk_size < 1:
+        raise HTTPException(status_code=400, detail="chunk_size must be positive")
+    if not db.query(models.User.id).filter(models.User.id == user_id).first():
+        raise HTTPException(status_code=404, detail="User not found")
+    job = bulk.create_job("delete_user")
+    background_tasks.add_task(bulk.delete_user, job, user_id, chunk_size)
+    return job
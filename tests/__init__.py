@@ -0,0 +1,9 @@
+from app.migrations import upgrade_schema
+
+# Bring blog.db up to the current models, as app.main does at startup
+upgrade_schema()
+"""
+The tests read and write the tracked `blog.db`, which keeps the schema it was created
+with. Upgrading it here lets test modules that use `SessionLocal` directly run on
+their own, without importing `app.main` first.
+"""
@@ -0,0 +1,117 @@
+import unittest
+import uuid
+from datetime import datetime, timedelta
+from unittest import mock
+from sqlalchemy.orm import Session
+from app import bulk, models
+from app.database import SessionLocal
+
+class TestBulk(unittest.TestCase):
+    def setUp(self):
+        """
+        Create a user with three posts, one of them commented, and skip the pause between chunks.
+        """
+        self.db: Session = SessionLocal()
+        name = uuid.uuid4().hex
+        self.user = models.User(username=name, email=f"{name}@example.com", password="hashedpassword")
+        self.db.add(self.user)
+        self.db.commit()
+        self.user_id = self.user.id
+        self.posts = [models.Post(title=f"Bulk #{number}", content="Body", owner_id=self.user.id) for number in range(3)]
+        self.db.add_all(self.posts)
+        self.db.commit()
+        self.post_ids = [post.id for post in self.posts]
+        self.db.add(models.Comment(content="Comment", post_id=self.post_ids[0], author_id=self.user.id))
+        self.db.commit()
+        patcher = mock.patch.object(bulk, "CHUNK_PAUSE_SECONDS", 0)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        """
+        Remove the user, if a test left it behind, and close the session.
+        """
+        self.db.rollback()
+        self.db.query(models.User).filter(models.User.id == self.user_id).delete()
+        self.db.commit()
+        self.db.close()
+
+    def remaining_posts(self):
+        self.db.expire_all()
+        return self.db.query(models.Post).filter(models.Post.id.in_(self.post_ids)).all()
+
+    def assertJob(self, job, status, total, processed):
+        self.assertEqual((job["status"], job["total"], job["processed"]), (status, total, processed))
+        self.assertIsNone(job["error"])
+        self.assertIsNotNone(job["finished_at"])
+        self.assertIs(bulk.jobs[job["id"]], job)
+
+    def test_delete_posts_in_chunks(self):
+        job = bulk.create_job("delete")
+        self.assertEqual(job["status"], "pending")
+        bulk.delete_posts(job, bulk.post_filters(owner_id=self.user.id), chunk_size=1)
+        self.assertJob(job, "completed", 3, 3)
+        self.assertEqual(self.remaining_posts(), [])
+        comments = self.db.query(models.Comment).filter(models.Comment.post_id == self.post_ids[0]).count()
+        self.assertEqual(comments, 0)
+
+    def test_soft_delete_then_purge(self):
+        job = bulk.create_job("soft_delete")
+        bulk.delete_posts(job, bulk.post_filters(owner_id=self.user.id), soft=True, chunk_size=1)
+        self.assertJob(job, "completed", 3, 3)
+        remaining = self.remaining_posts()
+        self.assertEqual(len(remaining), 3)
+        self.assertTrue(all(post.deleted_at is not None for post in remaining))
+
+        # Tombstoned posts are not selected again by a second soft delete.
+        again = bulk.create_job("soft_delete")
+        bulk.delete_posts(again, bulk.post_filters(owner_id=self.user.id), soft=True)
+        self.assertJob(again, "completed", 0, 0)
+
+        # Posts tombstoned just now are younger than an hour and are kept.
+        recent = bulk.create_job("purge")
+        bulk.purge_deleted_posts(recent, older_than=timedelta(hours=1), chunk_size=1)
+        self.assertEqual(len(self.remaining_posts()), 3)
+
+        purge = bulk.create_job("purge")
+        bulk.purge_deleted_posts(purge, chunk_size=1)
+        self.assertEqual(purge["status"], "completed")
+        self.assertGreaterEqual(purge["processed"], 3)
+        self.assertEqual(purge["total"], purge["processed"])
+        self.assertEqual(self.remaining_posts(), [])
+
+    def test_delete_user_after_their_posts(self):
+        other = models.Post(title="Someone else's post", content="Body", owner_id=1)
+        self.db.add(other)
+        self.db.commit()
+        self.db.add(models.Comment(content="Reply", post_id=other.id, author_id=self.user_id))
+        self.db.commit()
+        user_id = self.user_id
+
+        job = bulk.create_job("delete_user")
+        bulk.delete_user(job, user_id, chunk_size=2)
+        self.assertJob(job, "completed", 3, 3)
+        self.assertEqual(self.remaining_posts(), [])
+        self.assertIsNone(self.db.query(models.User).filter(models.User.id == user_id).first())
+        self.assertEqual(self.db.query(models.Comment).filter(models.Comment.author_id == user_id).count(), 0)
+        self.assertIsNotNone(self.db.query(models.Post).filter(models.Post.id == other.id).first())
+        self.db.delete(other)
+        self.db.commit()
+
+    def test_finished_jobs_are_evicted_after_the_ttl(self):
+        finished = bulk.create_job("delete")
+        bulk.delete_posts(finished, bulk.post_filters(owner_id=self.user_id))
+        running = bulk.create_job("delete")
+        running["status"] = "running"
+        recent = bulk.create_job("purge")
+        recent["finished_at"] = datetime.utcnow()
+        finished["finished_at"] -= bulk.JOB_TTL + timedelta(seconds=1)
+        running["created_at"] -= bulk.JOB_TTL * 2
+
+        latest = bulk.create_job("purge")
+        self.assertNotIn(finished["id"], bulk.jobs)
+        for job in (running, recent, latest):
+            self.assertIs(bulk.jobs[job["id"]], job)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,7 +1,12 @@
 import unittest
+import uuid
+from datetime import datetime
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
 from sqlalchemy.orm import Session
 from app import models, schemas
 from app.database import SessionLocal
+from routers import comments
 
 class TestComments(unittest.TestCase):
     def setUp(self):
@@ -75,5 +80,55 @@ class TestComments(unittest.TestCase):
         deleted_comment = self.db.query(models.Comment).filter(models.Comment.id == comment.id).first()
         self.assertIsNone(deleted_comment)
 
+    def test_get_comments_if_none_match(self):
+        name = f"user-{uuid.uuid4().hex[:8]}"
+        user = models.User(username=name, email=f"{name}@example.com", password="hashedpassword")
+        self.db.add(user)
+        self.db.commit()
+        post = models.Post(title="Test Post", content="This is a test post.", owner_id=user.id)
+        self.db.add(post)
+        self.db.commit()
+        self.db.add(models.Comment(content="First.", post_id=post.id, author_id=user.id))
+        self.db.commit()
+
+        app = FastAPI()
+        app.include_router(comments.router)
+        client = TestClient(app)
+        response = client.get(f"/{post.id}")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()), 1)
+        etag = response.headers["ETag"]
+        self.assertIn("Last-Modified", response.headers)
+
+        response = client.get(f"/{post.id}", headers={"If-None-Match": etag})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b"")
+
+        self.db.add(models.Comment(content="Second.", post_id=post.id, author_id=user.id))
+        self.db.commit()
+        response = client.get(f"/{post.id}", headers={"If-None-Match": etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()), 2)
+
+    def test_comments_of_soft_deleted_posts_are_hidden(self):
+        post = models.Post(title="Test Post", content="This post will be tombstoned.", owner_id=1)
+        self.db.add(post)
+        self.db.commit()
+        self.db.add(models.Comment(content="Before.", post_id=post.id, author_id=1))
+        self.db.commit()
+        app = FastAPI()
+        app.include_router(comments.router)
+        client = TestClient(app)
+        self.assertEqual(len(client.get(f"/{post.id}").json()), 1)
+
+        post.deleted_at = datetime.utcnow()
+        self.db.commit()
+        self.assertEqual(client.get(f"/{post.id}").status_code, 404)
+        self.assertEqual(client.post(f"/?post_id={post.id}", json={"content": "After."}).status_code, 404)
+        self.assertEqual(self.db.query(models.Comment).filter(models.Comment.post_id == post.id).count(), 1)
+        # Unknown posts have no comments to list, and cannot be commented on.
+        self.assertEqual(client.get("/999999999").json(), [])
+        self.assertEqual(client.post("/?post_id=999999999", json={"content": "Lost."}).status_code, 404)
+
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,84 @@
+import os
+import sqlite3
+import tempfile
+import unittest
+from sqlalchemy import create_engine, event, inspect
+from app.database import enable_sqlite_foreign_keys
+from app.migrations import upgrade_schema
+
+LEGACY_SCHEMA = """
+CREATE TABLE users (id INTEGER PRIMARY KEY, username VARCHAR, email VARCHAR, password VARCHAR);
+CREATE TABLE posts (
+    id INTEGER PRIMARY KEY, title VARCHAR, content TEXT, created_at DATETIME,
+    owner_id INTEGER REFERENCES users (id)
+);
+CREATE TABLE comments (
+    id INTEGER PRIMARY KEY, content TEXT,
+    post_id INTEGER REFERENCES posts (id), author_id INTEGER REFERENCES users (id)
+);
+INSERT INTO users (id, username, email, password) VALUES (1, 'legacy', 'legacy@example.com', 'x');
+INSERT INTO posts (id, title, content, owner_id) VALUES (1, 'Legacy Post', 'Written before the upgrade.', 1);
+INSERT INTO comments (id, content, post_id, author_id) VALUES (1, 'Legacy comment.', 1, 1);
+"""
+
+class TestMigrations(unittest.TestCase):
+    def setUp(self):
+        """
+        Create a database with the schema `blog.db` had before the models gained cascades.
+        """
+        handle, self.path = tempfile.mkstemp(suffix=".db")
+        os.close(handle)
+        connection = sqlite3.connect(self.path)
+        connection.executescript(LEGACY_SCHEMA)
+        connection.close()
+        self.engine = create_engine(f"sqlite:///{self.path}")
+        event.listen(self.engine, "connect", enable_sqlite_foreign_keys)
+
+    def tearDown(self):
+        """
+        Remove the temporary database.
+        """
+        self.engine.dispose()
+        os.remove(self.path)
+
+    def post_foreign_keys(self):
+        return {fk["referred_table"]: fk["options"].get("ondelete") for fk in inspect(self.engine).get_foreign_keys("posts")}
+
+    def test_upgrade_adds_cascades_and_columns(self):
+        self.assertEqual(upgrade_schema(self.engine), {})
+        self.assertEqual(self.post_foreign_keys(), {"users": "CASCADE"})
+        self.assertIn("views", {column["name"] for column in inspect(self.engine).get_columns("posts")})
+        with self.engine.begin() as connection:
+            connection.exec_driver_sql("DELETE FROM users WHERE id = 1")
+            self.assertEqual(connection.exec_driver_sql("SELECT COUNT(*) FROM posts").scalar(), 0)
+            self.assertEqual(connection.exec_driver_sql("SELECT COUNT(*) FROM comments").scalar(), 0)
+        # A second run has nothing left to do.
+        self.assertEqual(upgrade_schema(self.engine), {})
+
+    def test_upgrade_replaces_stale_indexes(self):
+        with self.engine.begin() as connection:
+            connection.exec_driver_sql("ALTER TABLE posts ADD COLUMN deleted_at DATETIME")
+            connection.exec_driver_sql("CREATE INDEX ix_posts_deleted_at ON posts (deleted_at)")
+        upgrade_schema(self.engine)
+        indexes = {index["name"] for index in inspect(self.engine).get_indexes("posts")}
+        self.assertNotIn("ix_posts_deleted_at", indexes)
+        self.assertLessEqual({"ix_posts_created_at_id", "ix_posts_tombstones"}, indexes)
+        with self.engine.connect() as connection:
+            plan = connection.exec_driver_sql(
+                "EXPLAIN QUERY PLAN SELECT id FROM posts WHERE deleted_at IS NULL ORDER BY created_at, id LIMIT 10"
+            ).all()
+        self.assertIn("ix_posts_created_at_id", " ".join(row[-1] for row in plan))
+
+    def test_upgrade_skips_tables_with_orphan_rows(self):
+        with self.engine.begin() as connection:
+            connection.exec_driver_sql("PRAGMA foreign_keys=OFF")
+            connection.exec_driver_sql("INSERT INTO posts (id, title, owner_id) VALUES (2, 'Orphan', 0)")
+        skipped = upgrade_schema(self.engine)
+        self.assertEqual(list(skipped), ["posts"])
+        self.assertEqual(self.post_foreign_keys(), {"users": None})
+        self.assertIn("views", {column["name"] for column in inspect(self.engine).get_columns("posts")})
+        with self.engine.connect() as connection:
+            self.assertEqual(connection.exec_driver_sql("SELECT COUNT(*) FROM posts").scalar(), 2)
+
+if __name__ == "__main__":
+    unittest.main()
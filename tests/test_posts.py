@@ -1,16 +1,34 @@
 import unittest
-from sqlalchemy.orm import Session
-from app.models import Post
+import uuid
+import zlib
+from unittest import mock
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session, undefer
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.exc import OperationalError
+from app import compression, trending
+from app.models import Comment, Post
 from app.schemas import PostCreate
-from routers.posts import create_post, read_post, update_post, delete_post, search_posts
-from app.database import SessionLocal
+from routers import posts
+from routers.posts import create_post, update_post, delete_post, search_posts
+from app.database import SessionLocal, engine
+
+def posts_client():
+    """
+    Return a test client for an application serving only the posts router.
+    """
+    app = FastAPI()
+    app.include_router(posts.router)
+    return TestClient(app)
 
 class TestPosts(unittest.TestCase):
     def setUp(self):
         """
-        Set up a database session for testing.
+        Set up a database session and, for the endpoints that read request headers, a test client.
         """
         self.db: Session = SessionLocal()
+        self.client = posts_client()
 
     def tearDown(self):
         """
@@ -26,9 +44,9 @@ class TestPosts(unittest.TestCase):
 
     def test_read_post(self):
         post = self.db.query(Post).first()
-        response = read_post(post_id=post.id, db=self.db)
-        self.assertEqual(response.id, post.id)
-        self.assertEqual(response.title, post.title)
+        response = self.client.get(f"/posts/{post.id}").json()
+        self.assertEqual(response["id"], post.id)
+        self.assertEqual(response["title"], post.title)
 
     def test_update_post(self):
         post = self.db.query(Post).first()
@@ -37,12 +55,106 @@ class TestPosts(unittest.TestCase):
         self.assertEqual(response.title, updated_data.title)
         self.assertEqual(response.content, updated_data.content)
 
+    def test_update_post_sets_updated_at(self):
+        post = create_post(user_id=1, post=PostCreate(title="Test Post", content="Before."), db=self.db)
+        created = post.updated_at
+        response = update_post(post_id=post.id, post=PostCreate(title="Test Post", content="After."), db=self.db)
+        self.assertGreater(response.updated_at, created)
+
     def test_delete_post(self):
         post = self.db.query(Post).first()
         response = delete_post(post_id=post.id, db=self.db)
         self.assertEqual(response.id, post.id)
         self.assertIsNone(self.db.query(Post).filter(Post.id == post.id).first())
 
+    def test_delete_post_removes_comments(self):
+        post_data = PostCreate(title="Test Post", content="This post will be deleted.")
+        post = create_post(user_id=1, post=post_data, db=self.db)
+        comment = Comment(content="This comment goes with it.", post_id=post.id)
+        self.db.add(comment)
+        self.db.commit()
+        comment_id = comment.id
+
+        delete_post(post_id=post.id, db=self.db)
+        self.db.expire_all()
+        self.assertIsNone(self.db.query(Comment).filter(Comment.id == comment_id).first())
+
+    def test_soft_delete_post(self):
+        post_data = PostCreate(title="Test Post", content="This post will be tombstoned.")
+        post = create_post(user_id=1, post=post_data, db=self.db)
+        response = delete_post(post_id=post.id, soft=True, db=self.db)
+        self.assertIsNotNone(response.deleted_at)
+        self.assertIsNotNone(self.db.query(Post).filter(Post.id == post.id).first())
+        self.assertEqual(self.client.get(f"/posts/{post.id}").status_code, 404)
+
+    def stored_type(self, post_id):
+        """
+        Return the SQLite storage class of a post's body ("text" or "blob").
+        """
+        return self.db.execute(text("SELECT typeof(content) FROM posts WHERE id = :id"), {"id": post_id}).scalar()
+
+    def test_compressed_post_round_trip(self):
+        compression.COMPRESS_POST_CONTENT = True
+        try:
+            content = "Long-form test content. " * 200
+            post = create_post(user_id=1, post=PostCreate(title="Test Post", content=content), db=self.db)
+            self.assertEqual(self.stored_type(post.id), "blob")
+            response = self.client.get(f"/posts/{post.id}").json()
+            self.assertEqual(response["content"], content)
+        finally:
+            compression.COMPRESS_POST_CONTENT = False
+
+    def test_short_posts_are_stored_as_text(self):
+        short = "x" * (compression.COMPRESSION_THRESHOLD - 1)
+        self.assertEqual(compression.compress(short), short)
+        with mock.patch.object(compression, "COMPRESS_POST_CONTENT", True):
+            post = create_post(user_id=1, post=PostCreate(title="Short Post", content=short), db=self.db)
+        self.assertEqual(self.stored_type(post.id), "text")
+
+    def test_compact_posts_follows_the_current_mode(self):
+        content = "Compact me. " * 200
+        with mock.patch.object(compression, "COMPRESS_POST_CONTENT", True):
+            post = create_post(user_id=1, post=PostCreate(title="Compacted Post", content=content), db=self.db)
+        updated_at = post.updated_at
+        self.assertEqual(self.stored_type(post.id), "blob")
+
+        rewritten = compression.compact_posts(self.db, chunk_size=2)
+        self.assertEqual(rewritten, self.db.query(Post).count())
+        self.assertEqual(self.stored_type(post.id), "text")
+        with mock.patch.object(compression, "COMPRESS_POST_CONTENT", True):
+            compression.compact_posts(self.db)
+        self.assertEqual(self.stored_type(post.id), "blob")
+
+        self.db.expire_all()
+        stored = self.db.query(Post).options(undefer(Post.content)).filter(Post.id == post.id).one()
+        self.assertEqual(stored.content, content)
+        self.assertEqual(stored.updated_at, updated_at)
+
+    def test_read_post_counts_views(self):
+        post = create_post(user_id=1, post=PostCreate(title="Test Post", content="Count my views."), db=self.db)
+        self.client.get(f"/posts/{post.id}")
+        self.client.get(f"/posts/{post.id}")
+        trending.flush_views(self.db)
+        self.db.expire_all()
+        updated = self.db.query(Post).filter(Post.id == post.id).first()
+        self.assertEqual(updated.views, 2)
+        self.assertIsNotNone(updated.trending_score)
+
+    def test_trending_worker_logs_failures(self):
+        with mock.patch.object(trending, "flush_views", side_effect=RuntimeError("database is locked")), \
+                mock.patch.object(trending._stop, "wait", return_value=True), \
+                self.assertLogs("app.trending", level="ERROR") as logs:
+            trending._run()
+        self.assertIn("database is locked", logs.output[0])
+
+    def test_sql_functions_are_registered_per_engine(self):
+        packed = zlib.compress(b"Compressed body")
+        row = self.db.execute(text("SELECT log2_add(NULL, 1.5), log2_add(1, 1), inflate(:packed)"), {"packed": packed}).one()
+        self.assertEqual(tuple(row), (1.5, 2.0, "Compressed body"))
+        with create_engine("sqlite://").connect() as connection:
+            with self.assertRaises(OperationalError):
+                connection.exec_driver_sql("SELECT log2_add(1, 1)")
+
     def test_search_posts(self):
         search_query = "Test"
         response = search_posts(query=search_query, db=self.db)
@@ -50,5 +162,126 @@ class TestPosts(unittest.TestCase):
         for post in response:
             self.assertTrue(search_query in post.title or search_query in post.content)
 
+class TestPostsHTTP(unittest.TestCase):
+    def setUp(self):
+        """
+        Set up a test client for the posts router.
+        """
+        self.client = posts_client()
+
+    def create_post(self, title="Test Post", content="This is a test post."):
+        response = self.client.post("/posts/?user_id=1", json={"title": title, "content": content})
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_search_matches_compressed_and_plain_rows_in_either_mode(self):
+        needle = uuid.uuid4().hex
+        with mock.patch.object(compression, "COMPRESS_POST_CONTENT", True):
+            packed = self.create_post(title="Compressed", content=f"{needle} " + "Long-form content. " * 100)
+        plain = self.create_post(title="Plain", content=f"Short {needle}")
+        for enabled in (False, True):
+            with mock.patch.object(compression, "COMPRESS_POST_CONTENT", enabled):
+                response = self.client.get("/posts/search/", params={"query": needle})
+            self.assertEqual(sorted(post["id"] for post in response.json()), sorted([packed["id"], plain["id"]]))
+
+    def test_read_posts_are_ordered_by_creation(self):
+        for number in range(3):
+            self.create_post(title=f"Ordered #{number}")
+        response = self.client.get("/posts/", params={"limit": 1000})
+        keys = [(post["created_at"], post["id"]) for post in response.json()]
+        self.assertEqual(keys, sorted(keys))
+        page = self.client.get("/posts/", params={"skip": 1, "limit": 2}).json()
+        self.assertEqual([post["id"] for post in page], [post_id for _, post_id in keys[1:3]])
+
+    def test_read_posts_without_content_never_selects_bodies(self):
+        self.create_post(content="A body that is not read.")
+        statements = []
+
+        def record(connection, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(engine, "before_cursor_execute", record)
+        try:
+            response = self.client.get("/posts/", params={"include_content": "false", "limit": 100})
+        finally:
+            event.remove(engine, "before_cursor_execute", record)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.json())
+        for post in response.json():
+            self.assertNotIn("content", post)
+        self.assertTrue(statements)
+        self.assertEqual([statement for statement in statements if "posts.content" in statement], [])
+
+    def test_delete_post_returns_deleted_post(self):
+        post = self.create_post(content="Deleted over HTTP.")
+        response = self.client.delete(f"/posts/{post['id']}")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["id"], post["id"])
+        self.assertEqual(response.json()["content"], "Deleted over HTTP.")
+        self.assertEqual(response.json()["owner"]["id"], 1)
+        self.assertEqual(self.client.get(f"/posts/{post['id']}").status_code, 404)
+
+    def test_read_post_if_none_match(self):
+        post = self.create_post()
+        response = self.client.get(f"/posts/{post['id']}")
+        self.assertEqual(response.status_code, 200)
+        etag = response.headers["ETag"]
+        self.assertIn("Last-Modified", response.headers)
+        self.assertIn("max-age", response.headers["Cache-Control"])
+
+        response = self.client.get(f"/posts/{post['id']}", headers={"If-None-Match": etag})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b"")
+        self.assertEqual(response.headers["ETag"], etag)
+        response = self.client.get(f"/posts/{post['id']}", headers={"If-None-Match": f'"other", W/{etag}'})
+        self.assertEqual(response.status_code, 304)
+
+        self.client.put(f"/posts/{post['id']}", json={"title": "Changed", "content": "Changed."})
+        response = self.client.get(f"/posts/{post['id']}", headers={"If-None-Match": etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.headers["ETag"], etag)
+
+    def test_read_post_if_modified_since(self):
+        post = self.create_post()
+        last_modified = self.client.get(f"/posts/{post['id']}").headers["Last-Modified"]
+        response = self.client.get(f"/posts/{post['id']}", headers={"If-Modified-Since": last_modified})
+        self.assertEqual(response.status_code, 304)
+        response = self.client.get(f"/posts/{post['id']}", headers={"If-Modified-Since": "Mon, 01 Jan 2001 00:00:00 GMT"})
+        self.assertEqual(response.status_code, 200)
+        # `If-None-Match` takes precedence over `If-Modified-Since`.
+        response = self.client.get(
+            f"/posts/{post['id']}", headers={"If-None-Match": '"other"', "If-Modified-Since": last_modified}
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def test_read_post_if_modified_since_unusual_dates(self):
+        post = self.create_post()
+        # `-0000` parses to a naive datetime; it must be treated as UTC, not fail.
+        response = self.client.get(f"/posts/{post['id']}", headers={"If-Modified-Since": "Mon, 26 May 2125 20:17:16 -0000"})
+        self.assertEqual(response.status_code, 304)
+        response = self.client.get(f"/posts/{post['id']}", headers={"If-Modified-Since": "Mon, 26 May 2025 20:17:16 -0000"})
+        self.assertEqual(response.status_code, 200)
+        response = self.client.get(f"/posts/{post['id']}", headers={"If-Modified-Since": "not a date"})
+        self.assertEqual(response.status_code, 200)
+
+    def test_read_posts_if_none_match(self):
+        self.create_post()
+        response = self.client.get("/posts/?limit=5")
+        self.assertEqual(response.status_code, 200)
+        etag = response.headers["ETag"]
+        first = response.json()[0]
+
+        response = self.client.get("/posts/?limit=5", headers={"If-None-Match": etag})
+        self.assertEqual(response.status_code, 304)
+        # Listings ignore `If-Modified-Since`: deletions do not advance `Last-Modified`.
+        response = self.client.get("/posts/?limit=5", headers={"If-Modified-Since": "Mon, 26 May 2125 20:17:16 GMT"})
+        self.assertEqual(response.status_code, 200)
+        response = self.client.get("/posts/?limit=5&include_content=false", headers={"If-None-Match": etag})
+        self.assertEqual(response.status_code, 200)
+
+        self.client.put(f"/posts/{first['id']}", json={"title": "Changed", "content": "Changed."})
+        response = self.client.get("/posts/?limit=5", headers={"If-None-Match": etag})
+        self.assertEqual(response.status_code, 200)
+
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,189 @@
+import os
+import shutil
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from unittest import mock
+from sqlalchemy import create_engine, event, func, select
+from sqlalchemy.orm import sessionmaker
+from app import database, sharding
+from app.database import (
+    BUCKET_COUNT,
+    Base,
+    bucket_for_owner,
+    enable_sqlite_foreign_keys,
+    register_sqlite_functions,
+    sharded_sessionmaker,
+    shard_for_bucket,
+    shard_for_owner,
+    shard_for_post,
+)
+from app.models import Comment, Post, User
+from app.sharding import allocate_id, shard_metadata
+
+class TestMergePages(unittest.TestCase):
+    def test_merges_shards_in_created_at_order(self):
+        start = datetime(2024, 1, 1)
+        row = lambda id, minutes: SimpleNamespace(id=id, created_at=start + timedelta(minutes=minutes))
+        results = [[row(4, 0), row(2, 5), row(8, 9)], [], [row(3, 0), row(7, 2)]]
+        self.assertEqual([r.id for r in sharding.merge_pages(results)], [3, 4, 7, 2, 8])
+        self.assertEqual([r.id for r in sharding.merge_pages(results, skip=1, limit=2)], [4, 7])
+        self.assertEqual(sharding.merge_pages(results, skip=5, limit=2), [])
+
+    def test_rows_without_created_at_come_first(self):
+        results = [[SimpleNamespace(id=2, created_at=datetime(2024, 1, 1))], [SimpleNamespace(id=5, created_at=None)]]
+        self.assertEqual([r.id for r in sharding.merge_pages(results)], [5, 2])
+
+class TestShardRouting(unittest.TestCase):
+    def test_ids_locate_their_shard(self):
+        shard_engine = create_engine("sqlite://")
+        shard_metadata.create_all(bind=shard_engine)
+        bucket = bucket_for_owner(1)
+        with shard_engine.begin() as connection:
+            ids = [allocate_id(connection, bucket) for _ in range(3)]
+        self.assertEqual(len(set(ids)), 3)
+        for post_id in ids:
+            self.assertEqual(shard_for_bucket(post_id % BUCKET_COUNT, 4), shard_for_bucket(bucket, 4))
+        self.assertEqual(shard_for_bucket(bucket, 4), f"shard_{bucket % 4}")
+
+class TestShardedStorage(unittest.TestCase):
+    def setUp(self):
+        """
+        Create a global database and point `shard_engines` at shard files in a temporary directory.
+        """
+        self.directory = tempfile.mkdtemp()
+        self.engines = []
+        self.url_template = "sqlite:///" + os.path.join(self.directory, "shard_{index}.db")
+        self.global_engine = self.create_engine("sqlite:///" + os.path.join(self.directory, "blog.db"))
+        Base.metadata.create_all(bind=self.global_engine)
+        patcher = mock.patch.dict(database.shard_engines, clear=True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        """
+        Dispose of every engine and remove the temporary directory.
+        """
+        for engine in self.engines:
+            engine.dispose()
+        shutil.rmtree(self.directory)
+
+    def create_engine(self, url):
+        engine = create_engine(url, connect_args={"check_same_thread": False})
+        event.listen(engine, "connect", enable_sqlite_foreign_keys)
+        event.listen(engine, "connect", register_sqlite_functions)
+        self.engines.append(engine)
+        return engine
+
+    def use_shards(self, shard_count):
+        """
+        Configure `shard_count` shard files and return a session over them.
+        """
+        database.shard_engines.clear()
+        for index in range(shard_count):
+            database.shard_engines[f"shard_{index}"] = self.create_engine(self.url_template.format(index=index))
+        sharding.create_shard_tables()
+        session = sharded_sessionmaker(self.global_engine)()
+        self.addCleanup(session.close)
+        return session
+
+    def shard_counts(self):
+        counts = {}
+        for shard_id, engine in database.shard_engines.items():
+            with engine.connect() as connection:
+                counts[shard_id] = connection.execute(select(func.count()).select_from(sharding.shard_posts)).scalar()
+        return counts
+
+    def create_content(self, db):
+        """
+        Create users on different shards, each with posts, and a comment by another user.
+        """
+        users = [User(username=f"user{index}", email=f"user{index}@example.com", password="x") for index in range(8)]
+        db.add_all(users)
+        db.commit()
+        start = datetime(2024, 1, 1)
+        for index, user in enumerate(users):
+            for number in range(3):
+                db.add(Post(title=f"{user.username} #{number}", content="Body", owner_id=user.id, created_at=start + timedelta(minutes=(index * 7 + number * 5) % 11)))
+        db.commit()
+        post = db.query(Post).filter(Post.owner_id == users[0].id).first()
+        db.add(Comment(content="Nice post.", post_id=post.id, author_id=users[1].id))
+        db.commit()
+        return users
+
+    def test_posts_are_routed_merged_and_rebalanced(self):
+        db = self.use_shards(2)
+        users = self.create_content(db)
+        self.assertEqual(len({shard_for_owner(user.id) for user in users}), 2)
+        for post in db.query(Post).all():
+            self.assertEqual(shard_for_post(post.id), shard_for_owner(post.owner_id))
+        self.assertEqual(sum(self.shard_counts().values()), 24)
+
+        # Listings merge the shards on (created_at, id) and load owners from the global shard.
+        expected = sorted(db.query(Post).all(), key=lambda post: (post.created_at, post.id))
+        page = sharding.paginate(db.query(Post).options(sharding.owner_loader()), skip=5, limit=10)
+        self.assertEqual([post.id for post in page], [post.id for post in expected[5:15]])
+        for post in page:
+            self.assertEqual(post.owner.id, post.owner_id)
+
+        # A post is found from its ID alone, together with its comments.
+        commented = db.query(Comment).one().post_id
+        db.expunge_all()
+        post = sharding.for_post(db.query(Post).filter(Post.id == commented), commented).one()
+        self.assertEqual([comment.content for comment in post.comments], ["Nice post."])
+        self.assertEqual(post.owner.id, users[0].id)
+        ids = [post.id for post in expected]
+        previous = {post_id: shard_for_post(post_id) for post_id in ids}
+        db.close()
+
+        # Growing to three shards moves only the posts whose bucket maps elsewhere, keeping their IDs.
+        db = self.use_shards(3)
+        moved = sharding.rebalance(chunk_size=2, global_engine=self.global_engine, url_template=self.url_template)
+        self.assertEqual(moved, sum(1 for post_id in ids if shard_for_post(post_id) != previous[post_id]))
+        self.assertEqual(sum(self.shard_counts().values()), 24)
+        self.assertGreater(self.shard_counts()["shard_2"], 0)
+        for post_id in ids:
+            self.assertEqual(db.get(Post, post_id).id, post_id)
+        self.assertEqual([post.id for post in sharding.gather(db.query(Post))], ids)
+        self.assertEqual(sharding.rebalance(global_engine=self.global_engine, url_template=self.url_template), 0)
+        db.close()
+
+        # Shrinking to one shard drains the files beyond the new count.
+        db = self.use_shards(1)
+        sharding.rebalance(global_engine=self.global_engine, url_template=self.url_template)
+        self.assertEqual(self.shard_counts(), {"shard_0": 24})
+        for index in (1, 2):
+            with self.create_engine(self.url_template.format(index=index)).connect() as connection:
+                self.assertEqual(connection.execute(select(func.count()).select_from(sharding.shard_posts)).scalar(), 0)
+        self.assertEqual(len(db.get(Post, commented).comments), 1)
+
+    def test_rebalance_moves_posts_created_before_sharding(self):
+        db = sessionmaker(bind=self.global_engine)()
+        user = User(username="legacy", email="legacy@example.com", password="x")
+        db.add(user)
+        db.commit()
+        posts = [Post(title=f"Legacy #{number}", content="Body", owner_id=user.id) for number in range(3)]
+        db.add_all(posts)
+        db.commit()
+        db.add(Comment(content="Old comment.", post_id=posts[0].id, author_id=user.id))
+        db.commit()
+        user_id = user.id
+        db.close()
+
+        db = self.use_shards(2)
+        moved = sharding.rebalance(chunk_size=2, global_engine=self.global_engine, url_template=self.url_template)
+        self.assertEqual(moved, 3)
+        with self.global_engine.connect() as connection:
+            self.assertEqual(connection.execute(select(func.count()).select_from(Post.__table__)).scalar(), 0)
+        self.assertEqual(self.shard_counts()[shard_for_owner(user_id)], 3)
+        moved_posts = sharding.gather(db.query(Post))
+        self.assertEqual(sorted(post.title for post in moved_posts), ["Legacy #0", "Legacy #1", "Legacy #2"])
+        for post in moved_posts:
+            self.assertEqual(shard_for_post(post.id), shard_for_owner(user_id))
+        comment = db.query(Comment).one()
+        self.assertEqual(shard_for_post(comment.id), shard_for_owner(user_id))
+        self.assertEqual(db.get(Post, comment.post_id).title, "Legacy #0")
+
+if __name__ == "__main__":
+    unittest.main()
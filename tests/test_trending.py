@@ -0,0 +1,93 @@
+import math
+import unittest
+from datetime import datetime, timedelta
+from unittest import mock
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+from app import models, trending
+from app.database import SessionLocal
+from app.sql_functions import log2_add
+from routers import posts
+
+class FrozenDatetime(datetime):
+    """
+    A `datetime` whose `utcnow()` returns a fixed, settable time.
+    """
+    frozen = None
+
+    @classmethod
+    def utcnow(cls):
+        return cls.frozen
+
+class TestTrending(unittest.TestCase):
+    def setUp(self):
+        """
+        Create two posts, drain views buffered by other tests, and set up a client for the posts router.
+        """
+        self.db: Session = SessionLocal()
+        trending.flush_views(self.db)
+        self.posts = [models.Post(title=f"Trending #{number}", content="Body", owner_id=1) for number in range(2)]
+        self.db.add_all(self.posts)
+        self.db.commit()
+        app = FastAPI()
+        app.include_router(posts.router)
+        self.client = TestClient(app)
+
+    def tearDown(self):
+        """
+        Remove the posts and the trending list built from them.
+        """
+        for post in self.posts:
+            self.db.delete(post)
+        self.db.commit()
+        trending._trending = []
+        self.db.close()
+
+    def view_at(self, when, post, count):
+        """
+        Record `count` views of a post and flush them as if the time were `when`.
+        """
+        for _ in range(count):
+            trending.record_view(post.id)
+        FrozenDatetime.frozen = when
+        with mock.patch.object(trending, "datetime", FrozenDatetime):
+            trending.flush_views(self.db)
+
+    def test_log2_add(self):
+        self.assertEqual(log2_add(None, 3.0), 3.0)
+        self.assertAlmostEqual(log2_add(1.0, 1.0), 2.0)
+        self.assertAlmostEqual(log2_add(3.0, 1.0), math.log2(2 ** 3 + 2 ** 1))
+        # Scores far from the epoch do not overflow.
+        self.assertAlmostEqual(log2_add(5000.0, 5000.0), 5001.0)
+
+    def test_recent_views_outrank_older_ones(self):
+        older, recent = self.posts
+        # Far past the views of other tests, so these two posts lead the list.
+        start = datetime.utcnow() + timedelta(days=3650)
+        self.view_at(start, older, 4)
+        self.view_at(start + timedelta(hours=3 * trending.TRENDING_HALF_LIFE_HOURS), recent, 1)
+
+        self.db.expire_all()
+        self.assertEqual([post.views for post in self.posts], [4, 1])
+        self.assertGreater(recent.trending_score, older.trending_score)
+
+        trending.refresh_trending(self.db)
+        response = self.client.get("/posts/trending")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([post["id"] for post in response.json()[:2]], [recent.id, older.id])
+        self.assertEqual(response.json()[0]["views"], 1)
+        response = self.client.get("/posts/trending", params={"limit": 1})
+        self.assertEqual([post["id"] for post in response.json()], [recent.id])
+
+    def test_more_views_at_the_same_time_rank_higher(self):
+        fewer, more = self.posts
+        now = datetime.utcnow() + timedelta(days=3650)
+        self.view_at(now, fewer, 2)
+        self.view_at(now, more, 5)
+        trending.refresh_trending(self.db)
+        ids = [post["id"] for post in self.client.get("/posts/trending").json()]
+        self.assertLess(ids.index(more.id), ids.index(fewer.id))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,6 +1,14 @@
+import time
 import unittest
+import uuid
+from datetime import datetime, timedelta
+import jwt
 from fastapi.testclient import TestClient
+from app import models, tokens as refresh_tokens
+from app.config import ACCESS_TOKEN_EXPIRE_MINUTES, ALGORITHM, SECRET_KEY
+from app.database import SessionLocal
 from app.main import app
+from routers.users import create_access_token
 
 class TestUsers(unittest.TestCase):
     def setUp(self):
@@ -58,5 +66,93 @@ class TestUsers(unittest.TestCase):
         self.assertEqual(response.status_code, 400)
         self.assertEqual(response.json()["detail"], "Incorrect username or password")
 
+    def login_new_user(self):
+        """
+        Register a user with a unique name and log in as them.
+
+        Returns:
+            tuple[int, dict]: The user's ID and the token response.
+        """
+        username = f"user-{uuid.uuid4().hex[:8]}"
+        registered = self.client.post(
+            "/register", json={"username": username, "email": f"{username}@example.com", "password": "testpassword"}
+        )
+        response = self.client.post("/token", data={"username": username, "password": "testpassword"})
+        self.assertEqual(response.status_code, 200)
+        return registered.json()["id"], response.json()
+
+    def auth(self, tokens):
+        return {"Authorization": f"Bearer {tokens['access_token']}"}
+
+    def test_refresh_token_rotation(self):
+        _, tokens = self.login_new_user()
+        self.assertIn("refresh_token", tokens)
+        response = self.client.post("/token/refresh", json={"refresh_token": tokens["refresh_token"]})
+        self.assertEqual(response.status_code, 200)
+        rotated = response.json()
+        self.assertNotEqual(rotated["refresh_token"], tokens["refresh_token"])
+        # Replaying a used token fails and revokes the user's other refresh tokens.
+        response = self.client.post("/token/refresh", json={"refresh_token": tokens["refresh_token"]})
+        self.assertEqual(response.status_code, 401)
+        response = self.client.post("/token/refresh", json={"refresh_token": rotated["refresh_token"]})
+        self.assertEqual(response.status_code, 401)
+
+    def test_access_token_expires(self):
+        _, tokens = self.login_new_user()
+        lifetime = ACCESS_TOKEN_EXPIRE_MINUTES * 60
+        self.assertEqual(tokens["expires_in"], lifetime)
+        claims = jwt.decode(tokens["access_token"], SECRET_KEY, algorithms=[ALGORITHM])
+        self.assertAlmostEqual(claims["exp"], time.time() + lifetime, delta=60)
+
+        user_id, tokens = self.login_new_user()
+        username = jwt.decode(tokens["access_token"], SECRET_KEY, algorithms=[ALGORITHM])["sub"]
+        expired = create_access_token({"sub": username}, expires_delta=timedelta(seconds=-1))
+        response = self.client.delete(f"/{user_id}/tokens", headers={"Authorization": f"Bearer {expired}"})
+        self.assertEqual(response.status_code, 401)
+        response = self.client.delete(f"/{user_id}/tokens", headers=self.auth(tokens))
+        self.assertEqual(response.status_code, 200)
+
+    def test_expired_refresh_token_is_rejected(self):
+        _, tokens = self.login_new_user()
+        db = SessionLocal()
+        try:
+            db.query(models.RefreshToken).filter(
+                models.RefreshToken.token_hash == refresh_tokens.hash_token(tokens["refresh_token"])
+            ).update({models.RefreshToken.expires_at: datetime.utcnow() - timedelta(seconds=1)})
+            db.commit()
+        finally:
+            db.close()
+        response = self.client.post("/token/refresh", json={"refresh_token": tokens["refresh_token"]})
+        self.assertEqual(response.status_code, 401)
+
+    def test_revoke_tokens(self):
+        user_id, tokens = self.login_new_user()
+        _, other = self.login_new_user()
+        response = self.client.delete(f"/{user_id}/tokens", headers=self.auth(other))
+        self.assertEqual(response.status_code, 403)
+        response = self.client.post("/token/refresh", json={"refresh_token": tokens["refresh_token"]})
+        self.assertEqual(response.status_code, 200)
+        tokens = response.json()
+
+        response = self.client.delete(f"/{user_id}/tokens", headers=self.auth(tokens))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {"revoked": 1})
+        response = self.client.post("/token/refresh", json={"refresh_token": tokens["refresh_token"]})
+        self.assertEqual(response.status_code, 401)
+        # The other user's session is untouched.
+        response = self.client.post("/token/refresh", json={"refresh_token": other["refresh_token"]})
+        self.assertEqual(response.status_code, 200)
+
+    def test_delete_user_requires_the_same_user(self):
+        user_id, tokens = self.login_new_user()
+        _, other = self.login_new_user()
+        response = self.client.delete(f"/{user_id}")
+        self.assertEqual(response.status_code, 401)
+        response = self.client.delete(f"/{user_id}", headers=self.auth(other))
+        self.assertEqual(response.status_code, 403)
+        response = self.client.delete(f"/{user_id}", headers=self.auth(tokens))
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.json()["kind"], "delete_user")
+
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file